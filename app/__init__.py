@@ -23,6 +23,9 @@ def load_user(id):
     return User.query.get(int(id))
 
 def create_app(config_class=Config):
+    from app.startup import StartupTimer
+    timer = StartupTimer()
+
     app = Flask(__name__)
     app.config.from_object(config_class)
     
@@ -31,41 +34,89 @@ def create_app(config_class=Config):
         os.makedirs(app.instance_path)
     except OSError:
         pass
-        
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, 'job_success.db')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    from app.database import engine_options, is_sqlite, configure_sqlite
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app)
 
     # Initialize extensions
-    db.init_app(app)
-    migrate.init_app(app, db)
-    login_manager.init_app(app)
-    mail.init_app(app)
-    bootstrap.init_app(app)
-    csrf.init_app(app)
+    with timer.step('sqlalchemy'):
+        db.init_app(app)
+        if is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+            with app.app_context():
+                configure_sqlite(db.engine, app.config)
+    with timer.step('migrate'):
+        migrate.init_app(app, db)
+    with timer.step('login'):
+        login_manager.init_app(app)
+    with timer.step('mail'):
+        mail.init_app(app)
+    with timer.step('bootstrap'):
+        bootstrap.init_app(app)
+    with timer.step('csrf'):
+        csrf.init_app(app)
+
+    with timer.step('prediction cache'):
+        from app.ml.cache import prediction_cache
+        prediction_cache.init_app(app)
+
+    with timer.step('model store'):
+        from app.ml.store import model_store
+        from app.ml.registry import registry
+        model_store.init_app(app)
+        registry.init_app(app)
+
+    with timer.step('matching'):
+        from app.ml.matching import matching_engine
+        matching_engine.init_app(app)
+
+    with timer.step('search'):
+        from app.job_search import job_search
+        job_search.init_app(app)
 
     # Import models to ensure they are registered with SQLAlchemy
-    from app.models.user import User
-    from app.models.survey import Survey
-    from app.models.job_offer import JobOffer
+    with timer.step('models'):
+        from app.models.user import User
+        from app.models.survey import Survey
+        from app.models.job_offer import JobOffer
+        from app.models.analytics import SurveyStat
+        from app.models.match import JobMatch, MatchChange
 
     # Register blueprints
-    from app.routes.main import bp as main_bp
-    app.register_blueprint(main_bp)
+    with timer.step('blueprint main'):
+        from app.routes.main import bp as main_bp
+        app.register_blueprint(main_bp)
+
+    with timer.step('blueprint auth'):
+        from app.routes.auth import bp as auth_bp
+        app.register_blueprint(auth_bp, url_prefix='/auth')
 
-    from app.routes.auth import bp as auth_bp
-    app.register_blueprint(auth_bp, url_prefix='/auth')
+    with timer.step('blueprint survey'):
+        from app.routes.survey import bp as survey_bp
+        app.register_blueprint(survey_bp, url_prefix='/survey')
 
-    from app.routes.survey import bp as survey_bp
-    app.register_blueprint(survey_bp, url_prefix='/survey')
+    with timer.step('blueprint admin'):
+        from app.routes.admin import bp as admin_bp
+        app.register_blueprint(admin_bp, url_prefix='/admin')
 
-    from app.routes.admin import bp as admin_bp
-    app.register_blueprint(admin_bp, url_prefix='/admin')
+    with timer.step('blueprint job_offers'):
+        from app.routes.job_offers import bp as job_offers_bp
+        app.register_blueprint(job_offers_bp, url_prefix='/job-offers')
 
-    from app.routes.job_offers import bp as job_offers_bp
-    app.register_blueprint(job_offers_bp, url_prefix='/job-offers')
+    with timer.step('blueprint api'):
+        from app.routes.api import bp as api_bp
+        app.register_blueprint(api_bp, url_prefix='/api')
 
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Register CLI commands. The schema is created by `flask init-db` or
+    # `flask db upgrade`, never on startup.
+    with timer.step('cli'):
+        from app.cli import ml_cli, analytics_cli, audit_cli, match_cli, search_cli, init_db_command, startup_command
+        app.cli.add_command(ml_cli)
+        app.cli.add_command(analytics_cli)
+        app.cli.add_command(audit_cli)
+        app.cli.add_command(match_cli)
+        app.cli.add_command(search_cli)
+        app.cli.add_command(init_db_command)
+        app.cli.add_command(startup_command)
 
+    timer.finish(app)
     return app
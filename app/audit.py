@@ -0,0 +1,139 @@
+import re
+
+from flask import current_app
+from sqlalchemy import event
+
+from app import db
+from app.models.user import User
+from app.models.job_offer import JobOffer
+
+# GET endpoints that change data; the audit never requests them
+SKIP_ENDPOINTS = {
+    'static',
+    'bootstrap.static',
+    'auth.logout',
+    'auth.delete_profile',
+    'admin.delete_user',
+    'admin.delete_survey',
+    'admin.toggle_role',
+}
+
+# Extra query strings per endpoint, so filtered and sorted variants are audited too
+EXTRA_QUERY_STRINGS = {
+    'admin.admin_dashboard': [
+        'role=worker&q=a&industry=IT&success=yes',
+        'users_sort=email&surveys_sort=industry&surveys_dir=asc',
+        'users_sort=created_at&users_dir=desc&surveys_sort=success',
+    ],
+    'job_offers.search_jobs': ['q=python', 'q=pyth&location=sofia&industry=IT'],
+}
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def audit_users():
+    """One user per role to request the pages as, plus an anonymous visitor"""
+    users = {'anonymous': None}
+    for role in ('worker', 'employer'):
+        user = User.query.filter_by(role=role, is_admin=False).first()
+        if user is not None:
+            users[role] = user.id
+    admin = User.query.filter_by(is_admin=True).first()
+    if admin is not None:
+        users['admin'] = admin.id
+    return users
+
+
+def audit_urls(app):
+    """Every GET URL of the registered blueprints, with sample ids filled in"""
+    offer = JobOffer.query.order_by(JobOffer.id).first()
+    sample_ids = {'id': offer.id if offer else None, 'job_id': offer.id if offer else None}
+
+    urls = []
+    for rule in app.url_map.iter_rules():
+        if 'GET' not in rule.methods or rule.endpoint in SKIP_ENDPOINTS:
+            continue
+        values = {name: sample_ids.get(name) for name in rule.arguments}
+        if any(value is None for value in values.values()):
+            continue
+        url = rule.build(values)[1]
+        urls.append(url)
+        urls.extend(f'{url}?{query}' for query in EXTRA_QUERY_STRINGS.get(rule.endpoint, []))
+    return sorted(set(urls))
+
+
+def capture_queries(app, users, urls):
+    """Request every URL as every user and collect the distinct SELECTs issued.
+
+    Returns the queries and a list of (role, url, error) for pages that failed.
+    """
+    queries = {}
+    errors = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            queries.setdefault(statement, parameters)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client = app.test_client()
+        for role, user_id in users.items():
+            with client.session_transaction() as session:
+                session.clear()
+                if user_id is not None:
+                    session['_user_id'] = str(user_id)
+                    session['_fresh'] = True
+            for url in urls:
+                # A fresh app context per request, so g and the session are not
+                # shared with the previous request (as in a real server)
+                try:
+                    with app.app_context():
+                        response = client.get(url)
+                except Exception as e:
+                    errors.append((role, url, str(e)))
+                    continue
+                if response.status_code >= 500:
+                    errors.append((role, url, response.status))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return queries, errors
+
+
+def explain(connection, statement, parameters):
+    """Query plan lines and the tables read with a full scan"""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+        plan = [row[-1] for row in rows]
+        pattern = SQLITE_FULL_SCAN
+    else:
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+        plan = [row[0] for row in rows]
+        pattern = POSTGRES_FULL_SCAN
+
+    scanned = []
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match:
+            scanned.append(match.group(1))
+    return plan, scanned
+
+
+def audit_queries(allow=()):
+    """Explain every query the blueprints issue.
+
+    Returns the users and URLs requested, the pages that failed, and one
+    (statement, plan, scanned tables) entry per distinct query; tables in
+    ``allow`` are not reported as scanned.
+    """
+    app = current_app._get_current_object()
+    users = audit_users()
+    urls = audit_urls(app)
+    queries, errors = capture_queries(app, users, urls)
+
+    results = []
+    with db.engine.connect() as connection:
+        for statement, parameters in queries.items():
+            plan, scanned = explain(connection, statement, parameters)
+            results.append((statement, plan, [table for table in scanned if table not in allow]))
+    return users, urls, errors, results
@@ -0,0 +1,469 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+ml_cli = AppGroup('ml', help='Train the prediction model and maintain stored scores.')
+analytics_cli = AppGroup('analytics', help='Maintain the survey analytics rollups.')
+audit_cli = AppGroup('audit', help='Check the queries the application issues.')
+match_cli = AppGroup('match', help='Maintain the candidate-to-offer recommendations.')
+search_cli = AppGroup('search', help='Maintain the job offer search index.')
+
+
+@ml_cli.command('train')
+@click.option('--chunk-size', default=10000, show_default=True,
+              help='Number of surveys read from the database per query.')
+@click.option('--incremental', is_flag=True,
+              help='Fit an SGD logistic regression chunk by chunk with bounded memory.')
+@click.option('--epochs', default=1, show_default=True,
+              help='Passes over the data in incremental mode.')
+@click.option('--no-promote', is_flag=True,
+              help='Publish the new version without activating it, e.g. to shadow it first.')
+@click.option('--backend', default='linear', show_default=True,
+              type=click.Choice(['linear', 'hist_gradient_boosting']), help='Model family to train.')
+def train_command(chunk_size, incremental, epochs, no_promote, backend):
+    """Train the model on all labelled surveys and refresh stored scores and matches."""
+    from app.ml.training import train_from_database
+
+    try:
+        predictor, n_samples, accuracy, report = train_from_database(
+            chunk_size=chunk_size, incremental=incremental, epochs=epochs, activate=not no_promote,
+            backend=backend
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Trained on {n_samples} surveys, accuracy {accuracy:.3f}')
+    click.echo(report)
+
+    if no_promote:
+        click.echo(f'Published model version {predictor.version} without activating it')
+        return
+    model_changed(True, predictor)
+
+
+@ml_cli.command('search')
+@click.option('--folds', default=5, show_default=True, help='Cross-validation folds.')
+@click.option('--jobs', type=int, help='Worker processes (default: one per core).')
+@click.option('--chunk-size', default=10000, show_default=True,
+              help='Number of surveys read from the database per query.')
+@click.option('--scaling', is_flag=True,
+              help='Repeat the search with 1, 2, 4, ... processes and report the speedup.')
+@click.option('--no-promote', is_flag=True, help='Publish the best model without activating it.')
+def search_command(folds, jobs, chunk_size, scaling, no_promote):
+    """Cross-validate a hyperparameter grid on all cores and publish the best model."""
+    from app.ml.dataset import load_training_matrix, max_labelled_id
+    from app.ml.search import search_and_train
+    from app.ml.training import cache_features
+    from app.models.survey import Survey
+
+    through_id = max_labelled_id()
+    ids, X, y = load_training_matrix(Survey.id <= through_id, chunk_size=chunk_size)
+    try:
+        predictor, results, elapsed, scaling_rows = search_and_train(
+            X, y, folds=folds, jobs=jobs, trained_through_id=through_id,
+            activate=not no_promote, scaling=scaling
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    cache_features(predictor.version, predictor.pipeline, ids, X)
+
+    click.echo(f'{len(results)} candidates x {folds} folds on {len(y)} surveys in {elapsed:.2f}s')
+    for result in results:
+        params = ', '.join(f'{name}={value}' for name, value in result['params'].items())
+        click.echo(f"  accuracy {result['accuracy']:.3f} +/- {result['accuracy_std']:.3f}  "
+                   f"log loss {result['log_loss']:.4f}  {params}")
+    if scaling_rows:
+        click.echo('Scaling:')
+        for n_jobs, seconds, speedup, efficiency in scaling_rows:
+            click.echo(f'  {n_jobs:>3} processes  {seconds:8.2f}s  speedup {speedup:5.2f}x  '
+                       f'efficiency {efficiency:4.0%}')
+
+    if no_promote:
+        click.echo(f'Published model version {predictor.version} without activating it')
+        return
+    click.echo(f'Published model version {predictor.version}')
+    model_changed(True, predictor)
+
+
+@ml_cli.command('update')
+@click.option('--rescore', 'rescore_after', is_flag=True,
+              help='Refresh stored scores after folding in new surveys.')
+def update_command(rescore_after):
+    """Fold labelled surveys added since the last training into the model."""
+    from app.ml.online import online_updater
+
+    folded = online_updater.update()
+    if folded is None:
+        raise click.ClickException('No trained linear model, or another update is running.')
+    click.echo(f'Folded {folded} new surveys into the model')
+    if folded:
+        model_changed(rescore_after)
+
+
+@ml_cli.command('import-pickles')
+@click.argument('directory', default='app/ml', type=click.Path(exists=True, file_okay=False))
+def import_pickles_command(directory):
+    """Publish a model saved by older releases as job_success_model.pkl and scaler.pkl.
+
+    Only load pickles you created yourself: unpickling runs arbitrary code.
+    """
+    import json
+    import os
+    import joblib
+    from app.ml.features import FeaturePipeline
+    from app.ml.model import JobSuccessPredictor
+
+    predictor = JobSuccessPredictor()
+    # Older releases used the seven survey columns only
+    predictor.pipeline = FeaturePipeline.from_dict(None)
+    try:
+        predictor.model = joblib.load(os.path.join(directory, 'job_success_model.pkl'))
+        predictor.scaler = joblib.load(os.path.join(directory, 'scaler.pkl'))
+    except FileNotFoundError as e:
+        raise click.ClickException(str(e))
+
+    meta_path = os.path.join(directory, 'model_meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            predictor.trained_through_id = json.load(f).get('trained_through_id')
+
+    predictor.save()
+    click.echo(f'Published model version {predictor.version}')
+
+
+@ml_cli.command('benchmark')
+@click.option('--chunk-size', default=10000, show_default=True,
+              help='Number of surveys read from the database per query.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per batch latency call.')
+def benchmark_command(chunk_size, batch_size):
+    """Compare the model backends on accuracy and serving latency; publishes nothing."""
+    from app.ml.backends import benchmark_backends
+    from app.ml.dataset import load_training_matrix
+
+    _, X, y = load_training_matrix(chunk_size=chunk_size)
+    try:
+        results = benchmark_backends(X, y, batch_size=batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f'{len(y)} surveys, 80/20 split; latency of the served NumPy scorers')
+    click.echo(f"{'backend':<24}{'accuracy':>9}{'log loss':>10}{'ROC AUC':>9}{'fit':>9}"
+               f"{'1 row':>11}{f'{batch_size} rows':>13}{'sklearn':>13}{'vs sklearn':>12}")
+    for result in results:
+        roc_auc = f"{result['roc_auc']:.3f}" if 'roc_auc' in result else '-'
+        click.echo(f"{result['backend']:<24}{result['accuracy']:>9.3f}{result['log_loss']:>10.4f}"
+                   f"{roc_auc:>9}{result['fit_seconds']:>8.2f}s"
+                   f"{result['row_seconds'] * 1e6:>9.1f}us{result['batch_seconds'] * 1e6:>11.1f}us"
+                   f"{result['sklearn_batch_seconds'] * 1e6:>11.1f}us"
+                   f"{result['max_scorer_diff']:>12.1e}")
+
+
+@ml_cli.command('versions')
+def versions_command():
+    """List the model versions in the store, newest first."""
+    from app.ml.store import model_store
+
+    current, shadow = model_store.current_version(), model_store.shadow_version()
+    versions = model_store.versions()
+    if not versions:
+        click.echo('No model versions published')
+    for version in reversed(versions):
+        manifest = model_store.manifest(version)
+        accuracy = manifest['metrics'].get('accuracy')
+        flags = ' '.join(flag for flag, on in (('active', version == current), ('shadow', version == shadow)) if on)
+        click.echo(f"{version}  {manifest['model']:<18} {manifest['n_samples'] or '-':>8} surveys  "
+                   f"accuracy {'-' if accuracy is None else f'{accuracy:.3f}'}  {flags}")
+
+
+@ml_cli.command('promote')
+@click.argument('version')
+@click.option('--rescore', 'rescore_after', is_flag=True, help='Refresh stored scores afterwards.')
+def promote_command(version, rescore_after):
+    """Make VERSION the active model; workers switch to it within seconds."""
+    from app.ml.store import model_store
+
+    try:
+        model_store.set_current(version)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Model version {version} is now active')
+    model_changed(rescore_after)
+
+
+@ml_cli.command('rollback')
+@click.option('--rescore', 'rescore_after', is_flag=True, help='Refresh stored scores afterwards.')
+def rollback_command(rescore_after):
+    """Reactivate the previously active model version."""
+    from app.ml.store import model_store
+
+    try:
+        version = model_store.rollback()
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Rolled back to model version {version}')
+    model_changed(rescore_after)
+
+
+@ml_cli.command('shadow')
+@click.argument('version', required=False)
+@click.option('--stop', is_flag=True, help='Stop shadow scoring.')
+def shadow_command(version, stop):
+    """Score VERSION alongside the active model without serving its results.
+
+    The comparison of each worker is at /admin/model/shadow.
+    """
+    from app.ml.store import model_store
+
+    if stop:
+        model_store.clear_shadow()
+        click.echo('Shadow scoring stopped')
+        return
+    if version is None:
+        shadow = model_store.shadow_version()
+        click.echo(f'Shadowing model version {shadow}' if shadow else 'No shadow model version')
+        return
+    try:
+        model_store.set_shadow(version)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Shadowing model version {version}')
+
+
+@ml_cli.command('rescore')
+@click.option('--chunk-size', default=10000, show_default=True,
+              help='Number of surveys scored and written per batch.')
+@click.option('--start-after', default=0, help='Only rescore surveys with a larger id.')
+@click.option('--all', 'rescore_all', is_flag=True,
+              help='Also rescore surveys already scored by the current model.')
+def rescore_command(chunk_size, start_after, rescore_all):
+    """Refresh stored survey scores with the current model."""
+    run_rescore(chunk_size=chunk_size, start_after=start_after, rescore_all=rescore_all)
+
+
+def model_changed(rescore_after, predictor=None):
+    """Serve the new model, queue a rebuild of the matches, and rescore and apply it now if asked to"""
+    from app.ml.matching import notify_model_changed
+    from app.ml.registry import registry
+
+    registry.invalidate()
+    notify_model_changed()
+    if rescore_after:
+        run_rescore(predictor)
+    else:
+        click.echo('Run `flask ml rescore` to refresh the stored scores and matches')
+
+
+def run_rescore(predictor=None, **kwargs):
+    """Run the chunked rescoring job, echoing progress to the terminal"""
+    from app.ml.registry import get_predictor
+    from app.ml.rescore import rescore_surveys
+
+    predictor = predictor or get_predictor()
+    click.echo(f'Rescoring surveys with model version {predictor.version}')
+
+    def report(done, total, last_id):
+        click.echo(f'  {done}/{total} surveys rescored (last id {last_id})')
+
+    count = rescore_surveys(predictor, progress=report, **kwargs)
+    click.echo(f'Done, {count} surveys rescored')
+    refresh_matches()
+
+
+def refresh_matches():
+    """Apply the queued match changes, echoing the outcome"""
+    from app.ml.matching import match_worker
+
+    applied = match_worker.drain()
+    if applied is None:
+        click.echo('Another process is applying the queued match changes')
+    else:
+        click.echo(f'Applied {applied} queued match changes')
+
+
+@analytics_cli.command('rebuild')
+def rebuild_analytics_command():
+    """Recompute the survey_stat rollups from the survey table."""
+    from app.models.analytics import rebuild_survey_stats
+
+    count = rebuild_survey_stats()
+    click.echo(f'Rebuilt {count} rollup rows')
+
+
+@match_cli.command('rebuild')
+def rebuild_matches_command():
+    """Recompute every survey's and offer's top matches, e.g. after a model change."""
+    import time
+    from app.ml.matching import matching_engine
+
+    def report(industry, profiles, offers):
+        click.echo(f'  {industry}: {profiles} profiles x {offers} offers')
+
+    started = time.perf_counter()
+    written, scored = matching_engine.rebuild(progress=report)
+    seconds = time.perf_counter() - started
+    click.echo(f'Scored {scored} pairs and wrote {written} matches in {seconds:.2f}s')
+
+
+@match_cli.command('refresh')
+def refresh_matches_command():
+    """Apply the survey, offer and model changes queued since the last refresh."""
+    refresh_matches()
+
+
+@match_cli.command('benchmark')
+@click.option('--samples', default=20, show_default=True,
+              help='Surveys and offers of the database refreshed to time the full path.')
+@click.option('--profiles', default=1000000, show_default=True, help='Synthetic profiles for pair scoring.')
+@click.option('--offers', default=100000, show_default=True, help='Synthetic active offers for pair scoring.')
+def benchmark_matches_command(samples, profiles, offers):
+    """Time refreshes on the database (rolled back) and pair scoring on synthetic data; writes nothing."""
+    import time
+    import numpy as np
+    from app.ml.matching import OFFER_SIDE, SURVEY_SIDE, benchmark_refresh, matching_engine, score_pairs
+    from app.ml.model import INDUSTRIES
+
+    predictor = matching_engine.predictor()
+    click.echo(f'Model version {predictor.version}, top {matching_engine.top_k}')
+
+    timings = benchmark_refresh(samples)
+    click.echo('Incremental refresh with SQL, on this database:')
+    for side, label in ((SURVEY_SIDE, 'refresh_survey'), (OFFER_SIDE, 'refresh_offer')):
+        seconds = timings[side]
+        if not len(seconds):
+            click.echo(f'  {label}: nothing to refresh')
+            continue
+        click.echo(f'  {label}: median {np.median(seconds) * 1000:.1f} ms, '
+                   f'95th percentile {np.percentile(seconds, 95) * 1000:.1f} ms over {len(seconds)}')
+
+    rng = np.random.default_rng(42)
+    # Only one industry is ever scored at a time, at the pre-filtered sizes
+    n = max(1, profiles // len(INDUSTRIES))
+    m = max(1, offers // len(INDUSTRIES))
+    P = np.column_stack([rng.uniform(0, 10, n), rng.integers(1, 5, n), rng.integers(1, 11, n),
+                         rng.integers(0, 6, n), rng.integers(0, 5, n), rng.random(n), rng.random(n),
+                         np.zeros(n)])
+    O = np.column_stack([rng.uniform(0, 10, m), rng.integers(1, 5, m), np.zeros(m)])
+
+    def timed(function):
+        started = time.perf_counter()
+        function()
+        return time.perf_counter() - started
+
+    one_profile = timed(lambda: score_pairs(predictor, P[:1], O, matching_engine.pair_block))
+    one_offer = timed(lambda: score_pairs(predictor, P, O[:1], matching_engine.pair_block))
+    step = max(1, matching_engine.pair_block // n)
+    block = timed(lambda: score_pairs(predictor, P, O[:step], matching_engine.pair_block))
+    pairs_per_second = n * step / block
+
+    click.echo(f'Pair scoring only, no SQL; one synthetic industry: {n} profiles x {m} offers')
+    click.echo(f'  one survey vs {m} offers: {one_profile * 1000:.1f} ms')
+    click.echo(f'  one offer vs {n} profiles: {one_offer * 1000:.1f} ms')
+    click.echo(f'  rebuild: {pairs_per_second / 1e6:.1f}M pairs/s, '
+               f'about {profiles * offers / len(INDUSTRIES) / pairs_per_second / 60:.1f} min of scoring '
+               f'for all industries before the education pre-filter')
+
+
+@search_cli.command('reindex')
+def reindex_search_command():
+    """Create the search index if needed and rebuild it from the job offers"""
+    from app.job_search import job_search
+
+    count = job_search.reindex()
+    click.echo(f'Indexed {count} job offers ({job_search.backend()})')
+
+
+@search_cli.command('benchmark')
+@click.option('--offers', default=100000, show_default=True, help='Synthetic job offers.')
+@click.option('--queries', default=100, show_default=True, help='Full-text queries per kind.')
+@click.option('--like-queries', default=10, show_default=True, help='LIKE scan queries per kind.')
+def benchmark_search_command(offers, queries, like_queries):
+    """Time full-text and LIKE searches on synthetic offers in an in-memory database"""
+    from app.job_search import benchmark_search
+
+    build_seconds, results = benchmark_search(offers, queries, like_queries)
+    click.echo(f'Indexed {offers} synthetic offers in {build_seconds:.2f}s')
+    click.echo(f'{"backend":<8} {"query":<16} {"median ms":>10} {"p95 ms":>10} {"results":>8}')
+    for result in results:
+        click.echo(f'{result["backend"]:<8} {result["kind"]:<16} {result["median_ms"]:>10.2f} '
+                   f'{result["p95_ms"]:>10.2f} {result["mean_results"]:>8.1f}')
+
+
+@audit_cli.command('queries')
+@click.option('--allow', multiple=True, metavar='TABLE',
+              help='Table that may be read with a full scan. Repeatable.')
+@click.option('--verbose', is_flag=True, help='Print the plan of every query.')
+def audit_queries_command(allow, verbose):
+    """Explain every query the pages issue and fail on full table scans.
+
+    Requests each GET page as anonymous, worker, employer and admin against
+    the configured database, so run it on a copy with a few rows in each table.
+    """
+    from app.audit import audit_queries
+
+    users, urls, errors, results = audit_queries(allow=set(allow))
+    click.echo(f'Requested {len(urls)} pages as {", ".join(users)}; {len(results)} distinct queries')
+    for role, url, error in errors:
+        click.echo(f'Warning: {url} failed for {role}: {error}')
+
+    failures = 0
+    for statement, plan, scanned in results:
+        if scanned:
+            failures += 1
+            click.echo(f'\nFULL SCAN of {", ".join(scanned)}:')
+        elif not verbose:
+            continue
+        click.echo(statement)
+        click.echo('\n'.join(f'  {line}' for line in plan))
+
+    if failures:
+        raise click.ClickException(f'{failures} queries read a table with a full scan')
+    click.echo('No full table scans')
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the tables of a new database and mark it as migrated.
+
+    The first migration assumes the tables exist, so a new database is
+    created from the models and stamped with the latest revision; an
+    existing one is brought up to date with `flask db upgrade` instead.
+    """
+    from flask_migrate import stamp
+    from sqlalchemy import inspect
+    from app import db
+    from app.job_search import job_search
+
+    if inspect(db.engine).get_table_names():
+        raise click.ClickException('The database already has tables; run `flask db upgrade` instead.')
+    db.create_all()
+    # The search index is not a model table
+    job_search.create_index()
+    db.session.commit()
+    stamp()
+    click.echo('Created the database tables and stamped the latest migration')
+
+
+@click.command('startup')
+@click.option('--cold', 'runs', type=int, default=0, metavar='RUNS',
+              help='Also boot the app RUNS times in fresh interpreters and report import times.')
+@click.option('--top', default=10, show_default=True, help='Packages listed with --cold.')
+@with_appcontext
+def startup_command(runs, top):
+    """Show how long each step of creating the app took."""
+    timer = current_app.extensions['startup_timer']
+    click.echo(timer.report())
+
+    if runs:
+        import os
+        from app.startup import measure_cold_start
+
+        boot, packages = measure_cold_start(os.path.dirname(current_app.root_path), runs)
+        click.echo(f'\nCold start, median of {runs}: {boot:.1f} ms')
+        for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            click.echo(f'  {name:<28} {ms:8.1f} ms')
+        loaded = [name for name in ('sklearn', 'joblib', 'scipy') if packages.get(name)]
+        click.echo(f"  ML packages imported at boot: {', '.join(loaded) if loaded else 'none'}")
+
+    budget = current_app.config.get('STARTUP_BUDGET_MS')
+    if budget and timer.total * 1000 > budget:
+        raise click.ClickException(f'Startup took {timer.total * 1000:.0f} ms, over the {budget} ms budget')
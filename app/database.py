@@ -0,0 +1,52 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Engine options that only apply to a QueuePool, i.e. not to in-memory SQLite
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(app):
+    """SQLALCHEMY_ENGINE_OPTIONS without the pool settings the configured database cannot use"""
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if is_memory_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        for name in QUEUE_POOL_OPTIONS:
+            options.pop(name, None)
+    return options
+
+
+def configure_sqlite(engine, config):
+    """Set the concurrency pragmas on every new SQLite connection.
+
+    WAL lets readers run alongside a writer, synchronous=NORMAL only syncs
+    at checkpoints, busy_timeout makes a writer wait for the lock instead of
+    failing with "database is locked", and mmap_size reads pages through a
+    memory map.
+    """
+    synchronous = str(config.get('SQLITE_SYNCHRONOUS', 'NORMAL')).upper()
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f'SQLITE_SYNCHRONOUS must be one of {", ".join(SQLITE_SYNCHRONOUS_MODES)}')
+
+    pragmas = []
+    if config.get('SQLITE_WAL', True) and not is_memory_sqlite(str(engine.url)):
+        pragmas.append('PRAGMA journal_mode=WAL')
+    pragmas.append(f'PRAGMA synchronous={synchronous}')
+    pragmas.append(f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT', 5000))}")
+    pragmas.append(f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 0))}")
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
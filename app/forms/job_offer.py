@@ -1,6 +1,16 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, FloatField, IntegerField, SelectField, SubmitField
-from wtforms.validators import DataRequired, Length, NumberRange
+from wtforms.validators import DataRequired, Length, NumberRange, Optional
+
+INDUSTRY_CHOICES = [
+    ('IT', 'IT и Технологии'),
+    ('Finance', 'Финанси и Банкиране'),
+    ('Healthcare', 'Здравеопазване'),
+    ('Education', 'Образование'),
+    ('Manufacturing', 'Производство'),
+    ('Retail', 'Търговия'),
+    ('Other', 'Друго')
+]
 
 class JobOfferForm(FlaskForm):
     title = StringField('Заглавие на позицията', validators=[DataRequired(), Length(min=3, max=100)])
@@ -9,15 +19,7 @@ class JobOfferForm(FlaskForm):
     location = StringField('Локация', validators=[DataRequired(), Length(max=100)])
     salary_range = StringField('Диапазон на заплатата', validators=[Length(max=100)])
     industry_type = SelectField('Индустрия', 
-        choices=[
-            ('IT', 'IT и Технологии'),
-            ('Finance', 'Финанси и Банкиране'),
-            ('Healthcare', 'Здравеопазване'),
-            ('Education', 'Образование'),
-            ('Manufacturing', 'Производство'),
-            ('Retail', 'Търговия'),
-            ('Other', 'Друго')
-        ],
+        choices=INDUSTRY_CHOICES,
         validators=[DataRequired()]
     )
     required_experience = FloatField('Изискван опит (години)', 
@@ -33,4 +35,16 @@ class JobOfferForm(FlaskForm):
         validators=[DataRequired()],
         coerce=int
     )
-    submit = SubmitField('Публикувай обява') 
\ No newline at end of file
+    submit = SubmitField('Публикувай обява') 
+
+class JobSearchForm(FlaskForm):
+    """Keyword search over job offers, submitted with GET"""
+    class Meta:
+        csrf = False
+
+    q = StringField('Ключови думи', validators=[Optional(), Length(max=200)])
+    industry = SelectField('Индустрия', choices=[('', 'Всички индустрии')] + INDUSTRY_CHOICES,
+        validators=[Optional()]
+    )
+    location = StringField('Локация', validators=[Optional(), Length(max=100)])
+    submit = SubmitField('Търси')
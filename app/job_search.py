@@ -0,0 +1,303 @@
+import re
+
+from sqlalchemy import and_, case, column, func, literal_column, or_, select, table, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models.job_offer import JobOffer
+
+# Indexed columns and the ranking weight of a match in each
+COLUMN_WEIGHTS = {'title': 10.0, 'description': 1.0, 'requirements': 2.0, 'location': 4.0}
+SEARCH_COLUMNS = list(COLUMN_WEIGHTS)
+
+# Words beyond this are ignored, so a pasted paragraph cannot make a huge query
+MAX_TERMS = 8
+
+# Letters and digits, the same tokens FTS5's unicode61 tokenizer produces
+TERM_PATTERN = re.compile(r'[^\W_]+')
+
+# Words in nearly every offer; they do not narrow a search but make it rank every offer
+STOP_WORDS = frozenset(
+    'и в на за с от до по се да е са а или не като при към със the and or of to in for with a an on at is'.split()
+)
+
+FTS_TABLE = 'job_offer_fts'
+# A separate FTS5 table whose rowid is the offer id. remove_diacritics folds
+# accents, and the prefix option keeps 2- and 3-character prefix indexes so
+# search-as-you-type queries do not scan the whole vocabulary.
+FTS_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(SEARCH_COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+# PostgreSQL ranks matches with weights A-D. Must stay identical to the
+# expression of the ix_job_offer_search GIN index, or the index is not used.
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', location), 'B') || "
+    "setweight(to_tsvector('simple', requirements), 'C') || "
+    "setweight(to_tsvector('simple', description), 'D')"
+)
+POSTGRES_INDEX = f'CREATE INDEX IF NOT EXISTS ix_job_offer_search ON job_offer USING GIN (({POSTGRES_DOCUMENT}))'
+
+fts = table(FTS_TABLE, column('rowid'), *[column(name) for name in SEARCH_COLUMNS])
+
+
+def search_terms(query):
+    """Lower-cased words of a search query without stop words, at most MAX_TERMS"""
+    terms = [term.lower() for term in TERM_PATTERN.findall(query or '')]
+    return [term for term in terms if term not in STOP_WORDS][:MAX_TERMS]
+
+
+def is_prefix(term):
+    # A single character would expand to a large share of the vocabulary
+    return len(term) > 1
+
+
+def fts_expression(terms, location_terms=()):
+    """FTS5 query matching offers that contain every term as a word prefix.
+
+    Terms only hold letters and digits, so quoting them is enough to keep
+    FTS5 operators out of user input.
+    """
+    parts = [f'"{term}"' + ('*' if is_prefix(term) else '') for term in terms]
+    parts += [f'location : "{term}"*' for term in location_terms]
+    return ' '.join(parts)
+
+
+def offer_filters(industry=None, is_active=True):
+    """Conditions on job_offer columns shared by every backend"""
+    filters = []
+    if industry:
+        filters.append(JobOffer.industry_type == industry)
+    if is_active is not None:
+        filters.append(JobOffer.is_active == is_active)
+    return filters
+
+
+def fts_select(terms, location_terms=(), filters=(), limit=20, offset=0):
+    """Ids of the matching offers, best first by BM25, from the FTS5 index"""
+    rank = func.bm25(literal_column(FTS_TABLE), *COLUMN_WEIGHTS.values())
+    return select(JobOffer.id) \
+        .select_from(fts) \
+        .join(JobOffer.__table__, JobOffer.id == fts.c.rowid) \
+        .where(literal_column(FTS_TABLE).op('MATCH')(fts_expression(terms, location_terms)), *filters) \
+        .order_by(rank, JobOffer.created_at.desc()) \
+        .limit(limit).offset(offset)
+
+
+def postgres_select(terms, location_terms=(), filters=(), limit=20, offset=0):
+    """Ids of the matching offers, best first by ts_rank_cd, from the GIN expression index"""
+    conditions = list(filters) + location_conditions(location_terms)
+    order = [JobOffer.created_at.desc()]
+    if terms:
+        document = literal_column(f'({POSTGRES_DOCUMENT})')
+        query = func.to_tsquery('simple', ' & '.join(term + (':*' if is_prefix(term) else '') for term in terms))
+        conditions.append(document.op('@@')(query))
+        order.insert(0, func.ts_rank_cd(document, query).desc())
+    return select(JobOffer.id).where(*conditions).order_by(*order).limit(limit).offset(offset)
+
+
+def like_select(terms, location_terms=(), filters=(), limit=20, offset=0):
+    """Ids of the matching offers by substring scan; offers matching in the title come first"""
+    columns = [getattr(JobOffer, name) for name in SEARCH_COLUMNS]
+    conditions = list(filters) + location_conditions(location_terms)
+    conditions += [or_(*[column.ilike(f'%{term}%') for column in columns]) for term in terms]
+    in_title = case((and_(*[JobOffer.title.ilike(f'%{term}%') for term in terms]), 0), else_=1) if terms else 0
+    return select(JobOffer.id).where(*conditions) \
+        .order_by(in_title, JobOffer.created_at.desc()) \
+        .limit(limit).offset(offset)
+
+
+def location_conditions(location_terms):
+    """Location filters for the backends without an FTS5 column filter"""
+    return [JobOffer.location.ilike(f'%{term}%') for term in location_terms]
+
+
+class JobOfferSearch:
+    """Keyword search over job offers' title, description, requirements and location.
+
+    On SQLite the text is kept in an FTS5 table that the job offer routes
+    update in the same transaction as the offer; on PostgreSQL a GIN index
+    over a weighted tsvector of the offer columns maintains itself. Other
+    databases, and SQLite without the index, fall back to a LIKE scan.
+    Every word of a query must match the start of a word in the offer.
+    """
+
+    def __init__(self):
+        self.dialect = 'sqlite'
+        self._has_fts = None
+
+    def init_app(self, app):
+        self.dialect = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+        self._has_fts = None
+
+    def backend(self):
+        """'fts5', 'postgresql' or 'like'"""
+        if self.dialect == 'postgresql':
+            return 'postgresql'
+        if self.dialect == 'sqlite':
+            if self._has_fts is None:
+                # Checked once per process, not per search; a table created
+                # later by another process is used after a restart
+                self._has_fts = bool(db.session.execute(text(f'PRAGMA table_info({FTS_TABLE})')).first())
+            if self._has_fts:
+                return 'fts5'
+        return 'like'
+
+    def search(self, query='', industry=None, location='', is_active=True, limit=20, offset=0):
+        """Job offers matching every word of ``query``, best first.
+
+        ``location`` words must match the offer's location. Without query
+        words the filtered offers are returned newest first.
+        """
+        terms = search_terms(query)
+        location_terms = search_terms(location)
+        filters = offer_filters(industry, is_active)
+        backend = self.backend()
+        if not terms and not location_terms:
+            statement = select(JobOffer.id).where(*filters) \
+                .order_by(JobOffer.created_at.desc(), JobOffer.id.desc()).limit(limit).offset(offset)
+        elif backend == 'fts5':
+            statement = fts_select(terms, location_terms, filters, limit, offset)
+        elif backend == 'postgresql':
+            statement = postgres_select(terms, location_terms, filters, limit, offset)
+        else:
+            statement = like_select(terms, location_terms, filters, limit, offset)
+
+        ids = db.session.scalars(statement).all()
+        offers = {offer.id: offer for offer in JobOffer.query.options(joinedload(JobOffer.employer)).filter(JobOffer.id.in_(ids))} if ids else {}
+        return [offers[offer_id] for offer_id in ids if offer_id in offers]
+
+    # Index maintenance
+
+    def create_index(self, connection=None):
+        """Create the FTS5 table or the PostgreSQL GIN index if it does not exist"""
+        connection = connection or db.session.connection()
+        if self.dialect == 'sqlite':
+            connection.execute(text(FTS_SCHEMA))
+        elif self.dialect == 'postgresql':
+            connection.execute(text(POSTGRES_INDEX))
+        self._has_fts = self.dialect == 'sqlite'
+
+    def index_offer(self, job_offer):
+        """Add or replace an offer's text in the FTS5 table; the caller commits"""
+        if self.backend() != 'fts5':
+            return
+        if job_offer.id is None:
+            db.session.flush()
+        db.session.execute(fts.delete().where(fts.c.rowid == job_offer.id))
+        db.session.execute(fts.insert().values(
+            rowid=job_offer.id, **{name: getattr(job_offer, name) for name in SEARCH_COLUMNS}
+        ))
+
+    def remove_offers(self, offer_ids):
+        """Remove offers from the FTS5 table; the caller commits"""
+        if offer_ids and self.backend() == 'fts5':
+            db.session.execute(fts.delete().where(fts.c.rowid.in_(offer_ids)))
+
+    def reindex(self):
+        """Rebuild the FTS5 table from job_offer and merge its segments; returns the offers indexed"""
+        self.create_index()
+        count = db.session.scalar(select(func.count(JobOffer.id)))
+        if self.backend() == 'fts5':
+            db.session.execute(fts.delete())
+            db.session.execute(fts.insert().from_select(
+                ['rowid'] + SEARCH_COLUMNS,
+                select(JobOffer.id, *[getattr(JobOffer, name) for name in SEARCH_COLUMNS])
+            ))
+            db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+        db.session.commit()
+        return count
+
+
+job_search = JobOfferSearch()
+
+
+def synthetic_offers(count, seed=42, vocabulary_size=20000):
+    """Job offer rows with Zipf-distributed words, for benchmarks"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    syllables = [consonant + vowel for consonant in 'bdfgklmnprstvz' for vowel in 'aeiou']
+    words = sorted({''.join(rng.choice(syllables, rng.integers(2, 5))) for _ in range(vocabulary_size)})
+    cities = ['Sofia', 'Plovdiv', 'Varna', 'Burgas', 'Ruse', 'Stara Zagora', 'Pleven', 'Remote']
+    industries = ['IT', 'Finance', 'Healthcare', 'Education', 'Manufacturing', 'Retail', 'Other']
+
+    def text_of(length):
+        ranks = np.minimum(rng.zipf(1.2, length), len(words)) - 1
+        return ' '.join(words[rank] for rank in ranks)
+
+    rows = []
+    for i in range(count):
+        rows.append({
+            'employer_id': 1, 'title': text_of(4), 'description': text_of(60), 'requirements': text_of(20),
+            'location': cities[i % len(cities)], 'industry_type': industries[i % len(industries)],
+            'required_experience': float(i % 10), 'education_level': 1 + i % 4, 'is_active': i % 5 != 0,
+        })
+    return rows, words
+
+
+def benchmark_search(offers=100000, queries=100, like_queries=10, seed=42):
+    """Median and 95th percentile latency of FTS5 and LIKE searches over synthetic offers.
+
+    Builds its own in-memory SQLite database, so the configured one is not
+    touched. Each kind of query draws its words from the synthetic
+    vocabulary. Returns ``(seconds to build the index, one dict per backend
+    and kind of query)``.
+    """
+    import time
+    import numpy as np
+    from sqlalchemy import create_engine
+    from app.models.user import User
+
+    rows, words = synthetic_offers(offers, seed)
+    rng = np.random.default_rng(seed + 1)
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        db.metadata.create_all(connection, tables=[User.__table__, JobOffer.__table__])
+        for start in range(0, len(rows), 10000):
+            connection.execute(JobOffer.__table__.insert(), rows[start:start + 10000])
+        started = time.perf_counter()
+        connection.execute(text(FTS_SCHEMA))
+        connection.execute(fts.insert().from_select(
+            ['rowid'] + SEARCH_COLUMNS, select(JobOffer.id, *[getattr(JobOffer, name) for name in SEARCH_COLUMNS])
+        ))
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+        build_seconds = time.perf_counter() - started
+
+    # Words by frequency rank: the 50 most common appear in a large share of
+    # the offers, ranks 500-5000 in a few hundredths of a percent
+    def common():
+        return words[int(rng.integers(0, 50))]
+
+    def rare():
+        return words[int(rng.integers(500, 5000))]
+
+    kinds = {
+        'common word': lambda: ([common()], (), offer_filters()),
+        'rare word': lambda: ([rare()], (), offer_filters()),
+        'two words': lambda: ([common(), rare()], (), offer_filters()),
+        'prefix': lambda: ([rare()[:3]], (), offer_filters()),
+        'word + filters': lambda: ([rare()], ['sofia'], offer_filters('IT')),
+    }
+    results = []
+    with engine.connect() as connection:
+        for backend, select_function, runs in (('fts5', fts_select, queries), ('like', like_select, like_queries)):
+            for kind, make_query in kinds.items():
+                seconds, found = [], 0
+                for _ in range(runs):
+                    terms, location_terms, filters = make_query()
+                    statement = select_function(terms, location_terms, filters, limit=20)
+                    started = time.perf_counter()
+                    found += len(connection.execute(statement).all())
+                    seconds.append(time.perf_counter() - started)
+                results.append({
+                    'backend': backend, 'kind': kind, 'queries': runs,
+                    'median_ms': float(np.median(seconds)) * 1000,
+                    'p95_ms': float(np.percentile(seconds, 95)) * 1000,
+                    'mean_results': found / runs,
+                })
+    engine.dispose()
+    return build_seconds, results
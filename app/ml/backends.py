@@ -0,0 +1,204 @@
+import time
+
+import numpy as np
+
+from app.ml.model import CLASSES, JobSuccessPredictor, publish_model
+
+
+class LinearBackend:
+    """Standardized logistic regression; the model online learning and the CV search use"""
+
+    name = 'linear'
+
+    def __init__(self, **params):
+        self.predictor = JobSuccessPredictor()
+        self.params = params
+        if params:
+            self.predictor.model.set_params(**params)
+
+    def fit(self, X, y):
+        predictor = self.predictor
+        predictor.pipeline.fit(X, y)
+        predictor.model.fit(predictor.scaler.fit_transform(predictor.pipeline.transform(X)), y)
+        predictor.is_trained = True
+        return self
+
+    @property
+    def pipeline(self):
+        """The feature pipeline of the wrapped predictor"""
+        return self.predictor.pipeline
+
+    def predict_proba(self, X):
+        """Success probabilities from the scikit-learn estimator"""
+        return self.predictor.predict_matrix(X)
+
+    def scorer(self):
+        """The NumPy-only scorer the web tier would serve for this model"""
+        return self.predictor.export_scorer()
+
+    def save(self, n_samples=None, metrics=None, trained_through_id=None, activate=True):
+        """Publish to the model store and return the version"""
+        self.predictor.trained_through_id = trained_through_id
+        self.predictor.save(n_samples=n_samples, metrics=metrics, params=self.params, activate=activate)
+        return self.predictor.version
+
+
+class HistGradientBoostingBackend:
+    """Histogram-based gradient boosted trees; captures interactions the linear model cannot"""
+
+    name = 'hist_gradient_boosting'
+
+    DEFAULT_PARAMS = {'max_iter': 200, 'learning_rate': 0.1, 'max_leaf_nodes': 31}
+
+    # The export reads private scikit-learn internals; they match the version pinned in requirements.txt
+    NODE_FIELDS = ('is_leaf', 'feature_idx', 'num_threshold', 'left', 'right', 'value',
+                   'missing_go_to_left', 'gain', 'depth')
+
+    def __init__(self, **params):
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        from app.ml.features import FeaturePipeline
+
+        self.params = dict(self.DEFAULT_PARAMS, **params)
+        self.model = HistGradientBoostingClassifier(random_state=42, **self.params)
+        self.pipeline = FeaturePipeline.default()
+
+    def fit(self, X, y):
+        self.pipeline.fit(X, y)
+        self.model.fit(self.pipeline.transform(X), y)
+        if not np.array_equal(self.model.classes_, CLASSES):
+            raise ValueError('Training data needs both successful and unsuccessful surveys')
+        return self
+
+    def predict_proba(self, X):
+        """Success probabilities from the scikit-learn estimator"""
+        return self.model.predict_proba(self.pipeline.transform(X))[:, 1]
+
+    def fitted_trees(self):
+        """Node arrays of each fitted tree and the baseline log-odds, read from scikit-learn internals"""
+        import sklearn
+
+        hint = f'scikit-learn {sklearn.__version__} is installed, the export needs the version in requirements.txt'
+        try:
+            trees = [predictors[0].nodes for predictors in self.model._predictors]
+            baseline = np.asarray(self.model._baseline_prediction).ravel()[:1]
+            fields = trees[0].dtype.names or ()
+        except (AttributeError, IndexError, TypeError) as e:
+            raise ValueError(f'Cannot read the fitted trees ({e}); {hint}') from e
+        missing = [field for field in self.NODE_FIELDS if field not in fields]
+        if missing:
+            raise ValueError(f'Tree nodes lack the fields {", ".join(missing)}; {hint}')
+        return trees, baseline
+
+    def arrays(self):
+        """The fitted trees as flat node arrays, with child indices offset per tree"""
+        trees, baseline = self.fitted_trees()
+        offsets = np.cumsum([0] + [len(nodes) for nodes in trees[:-1]])
+        nodes = np.concatenate(trees)
+        is_leaf = nodes['is_leaf'].astype(bool)
+        child_offsets = np.repeat(offsets, [len(tree) for tree in trees])
+        return {
+            'baseline': baseline,
+            'roots': offsets,
+            'depths': [tree['depth'].max() for tree in trees],
+            'feature': np.where(is_leaf, -1, nodes['feature_idx']),
+            'threshold': nodes['num_threshold'],
+            'left': np.where(is_leaf, 0, nodes['left'] + child_offsets),
+            'right': np.where(is_leaf, 0, nodes['right'] + child_offsets),
+            'value': nodes['value'],
+            'missing_left': nodes['missing_go_to_left'],
+            'gain': np.where(is_leaf, 0, nodes['gain']),
+        }
+
+    def scorer(self):
+        """The NumPy-only scorer the web tier would serve for this model"""
+        from app.ml.scorer import TreeEnsembleScorer
+        return TreeEnsembleScorer.from_arrays(self.arrays(), {'pipeline': self.pipeline.to_dict()})
+
+    def save(self, n_samples=None, metrics=None, trained_through_id=None, activate=True):
+        """Publish to the model store and return the version"""
+        arrays = self.arrays()
+        return publish_model(
+            arrays, self.name, type(self.model).__name__,
+            n_samples=n_samples,
+            trained_through_id=trained_through_id,
+            metrics=metrics or {},
+            params=self.params,
+            trees=len(arrays['roots']),
+            pipeline=self.pipeline.to_dict(),
+            activate=activate,
+        )
+
+
+BACKENDS = {
+    LinearBackend.name: LinearBackend,
+    HistGradientBoostingBackend.name: HistGradientBoostingBackend,
+}
+
+
+def create_backend(name, **params):
+    if name not in BACKENDS:
+        raise ValueError(f'Unknown model backend {name}; choose from {", ".join(BACKENDS)}')
+    return BACKENDS[name](**params)
+
+
+def evaluate(backend, X_test, y_test):
+    """Accuracy, log loss and ROC AUC of a fitted backend on held-out rows"""
+    from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+
+    probabilities = backend.predict_proba(X_test)
+    metrics = {
+        'accuracy': float(accuracy_score(y_test, probabilities >= 0.5)),
+        'log_loss': float(log_loss(y_test, probabilities, labels=CLASSES)),
+    }
+    if len(np.unique(y_test)) == 2:
+        metrics['roc_auc'] = float(roc_auc_score(y_test, probabilities))
+    return metrics
+
+
+def time_per_call(function, argument, min_seconds=0.2):
+    """Median seconds per call over batches that together run at least ``min_seconds``"""
+    function(argument)
+    samples, elapsed, calls = [], 0.0, 1
+    while elapsed < min_seconds or len(samples) < 5:
+        started = time.perf_counter()
+        for _ in range(calls):
+            function(argument)
+        seconds = time.perf_counter() - started
+        samples.append(seconds / calls)
+        elapsed += seconds
+        if seconds < 0.01:
+            calls *= 2
+    return float(np.median(samples))
+
+
+def benchmark_backends(X, y, names=None, batch_size=1000, test_size=0.2):
+    """Fit every backend on the same split and measure accuracy against serving latency.
+
+    Latencies are for the NumPy-only scorers the web tier serves: one
+    ``predict_row`` call, and one ``predict_matrix`` call on ``batch_size``
+    rows, next to scikit-learn's ``predict_proba`` on the same batch as a
+    baseline. Returns one dict per backend.
+    """
+    from sklearn.model_selection import train_test_split
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    rows = np.resize(np.asarray(X_test, dtype=np.float64), (batch_size, X.shape[1]))
+    row = rows[0].tolist()
+
+    results = []
+    for name in names or BACKENDS:
+        backend = create_backend(name)
+        started = time.perf_counter()
+        backend.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - started
+        scorer = backend.scorer()
+        results.append(dict(
+            evaluate(backend, X_test, y_test),
+            backend=name,
+            fit_seconds=fit_seconds,
+            row_seconds=time_per_call(scorer.predict_row, row),
+            batch_seconds=time_per_call(scorer.predict_matrix, rows),
+            sklearn_batch_seconds=time_per_call(backend.predict_proba, rows),
+            max_scorer_diff=float(np.abs(scorer.predict_matrix(X_test) - backend.predict_proba(X_test)).max()),
+        ))
+    return results
@@ -0,0 +1,221 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.ml.model import RAW_COLUMNS, feature_matrix
+
+# Quantized value of a missing input (e.g. no job offer)
+MISSING_STEP = np.iinfo(np.int64).min
+
+
+class MemoryBackend:
+    """In-process LRU cache with a per-entry time to live"""
+
+    def __init__(self, max_size=10000, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires = entry
+                if expires < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, items):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Cache stored in a local SQLite file, shared by every worker process on the host"""
+
+    # Expired and excess entries are purged once every PURGE_EVERY writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path, max_size=100000, ttl=3600):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS prediction_cache '
+                '(key TEXT PRIMARY KEY, value REAL NOT NULL, expires REAL NOT NULL)'
+            )
+            # Both purge statements filter and order on expires
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_prediction_cache_expires ON prediction_cache (expires)')
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        conn = self._connection()
+        now = time.time()
+        found = {}
+        keys = list(keys)
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT key, value FROM prediction_cache WHERE key IN ({placeholders}) AND expires > ?',
+                chunk + [now]
+            )
+            found.update(rows)
+        return found
+
+    def set_many(self, items):
+        conn = self._connection()
+        expires = time.time() + self.ttl
+        conn.executemany(
+            'INSERT OR REPLACE INTO prediction_cache (key, value, expires) VALUES (?, ?, ?)',
+            [(key, value, expires) for key, value in items.items()]
+        )
+        self._writes += len(items)
+        if self._writes >= self.PURGE_EVERY:
+            self._writes = 0
+            self._purge(conn)
+
+    def _purge(self, conn):
+        conn.execute('DELETE FROM prediction_cache WHERE expires <= ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM prediction_cache WHERE key IN ('
+            'SELECT key FROM prediction_cache ORDER BY expires DESC LIMIT -1 OFFSET ?)',
+            (self.max_size,)
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM prediction_cache')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM prediction_cache').fetchone()[0]
+
+
+class PredictionCache:
+    """Caches success probabilities by quantized raw input row and model version.
+
+    Feature values are rounded to ``quantum`` before both the lookup and the
+    prediction, so near-identical profiles share one entry. The model version
+    is part of every key, so a model swap never serves old scores; the
+    in-process backend is also cleared when the version changes.
+    """
+
+    def __init__(self, backend=None, quantum=0.01):
+        self.backend = backend
+        self.quantum = quantum
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the backend from PREDICTION_CACHE_* settings"""
+        kind = app.config.get('PREDICTION_CACHE_BACKEND', 'memory')
+        size = app.config.get('PREDICTION_CACHE_SIZE', 10000)
+        ttl = app.config.get('PREDICTION_CACHE_TTL', 3600)
+        if kind == 'sqlite':
+            path = app.config.get('PREDICTION_CACHE_PATH') or \
+                os.path.join(app.instance_path, 'prediction_cache.db')
+            self.backend = SQLiteBackend(path, max_size=size, ttl=ttl)
+        elif kind == 'memory':
+            self.backend = MemoryBackend(max_size=size, ttl=ttl)
+        else:
+            self.backend = None
+        self.quantum = app.config.get('PREDICTION_CACHE_QUANTUM', 0.01)
+
+    def quantize(self, X):
+        X = np.asarray(X, dtype=float).reshape(-1, len(RAW_COLUMNS))
+        missing = np.isnan(X)
+        steps = np.round(np.where(missing, 0.0, X) / self.quantum).astype(np.int64)
+        steps[missing] = MISSING_STEP
+        return steps
+
+    def predict_matrix(self, predictor, X):
+        """Return probabilities for every raw input row, scoring only the rows not cached yet"""
+        steps = self.quantize(X)
+        X = np.where(steps == MISSING_STEP, np.nan, steps * self.quantum)
+        if self.backend is None or len(X) == 0:
+            return predictor.predict_matrix(X)
+
+        version = predictor.version
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    if isinstance(self.backend, MemoryBackend):
+                        self.backend.clear()
+                    self._version = version
+
+        keys = [f"{version}|{','.join(map(str, row))}" for row in steps.tolist()]
+        found = self.backend.get_many(set(keys))
+        missing = [i for i, key in enumerate(keys) if key not in found]
+
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            probabilities = predictor.predict_matrix(X[missing])
+            new_items = {keys[i]: float(p) for i, p in zip(missing, probabilities)}
+            self.backend.set_many(new_items)
+            found.update(new_items)
+
+        return np.array([found[key] for key in keys])
+
+    def predict(self, predictor, survey_data):
+        """Cached equivalent of predictor.predict()"""
+        return self.predict_matrix(predictor, feature_matrix([survey_data]))[0]
+
+    def stats(self):
+        """Hit/miss counters for this process and the current number of entries"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'model_version': self._version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'entries': len(self.backend) if self.backend is not None else 0,
+        }
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+prediction_cache = PredictionCache()
@@ -0,0 +1,117 @@
+import numpy as np
+from sqlalchemy import case, func, select
+
+from app import db
+from app.models.job_offer import JobOffer
+from app.models.survey import Survey
+from app.ml.model import FEATURE_COLUMNS, INDUSTRIES, INDUSTRY_ALIASES, RAW_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def feature_columns():
+    """Survey columns holding the model features, in feature-matrix order"""
+    return [getattr(Survey, column) for column in FEATURE_COLUMNS]
+
+
+def industry_code_column(column):
+    """SQL expression for app.ml.model.industry_code() of an industry column"""
+    value = func.lower(func.trim(column))
+    codes = {industry: code for code, industry in enumerate(INDUSTRIES)}
+    codes.update({alias: codes[industry] for alias, industry in INDUSTRY_ALIASES.items()})
+    return case(
+        (func.coalesce(value, '') == '', None),
+        *[(value == name, code) for name, code in codes.items()],
+        else_=codes['other'],
+    )
+
+
+def industry_values(code):
+    """Stored industry strings that map to an INDUSTRIES index, in the spellings the forms use"""
+    names = [INDUSTRIES[code]] + [alias for alias, industry in INDUSTRY_ALIASES.items() if industry == INDUSTRIES[code]]
+    return sorted({spelling for name in names for spelling in (name, name.capitalize(), name.upper())})
+
+
+def industry_filter(column, code):
+    """SQL condition on an industry column for one INDUSTRIES index; equality tests, so indexes apply"""
+    if INDUSTRIES[code] != 'other':
+        return column.in_(industry_values(code))
+    known = [value for other in range(len(INDUSTRIES)) if INDUSTRIES[other] != 'other'
+             for value in industry_values(other)]
+    return column.notin_(known)
+
+
+def raw_columns():
+    """Columns of the raw input matrix (RAW_COLUMNS); select them with ``with_offer=True``"""
+    return feature_columns() + [
+        industry_code_column(Survey.industry_type),
+        JobOffer.required_experience,
+        JobOffer.education_level,
+        industry_code_column(JobOffer.industry_type),
+    ]
+
+
+def labelled_filter():
+    """SQL condition matching surveys that can be used for training"""
+    return Survey.success.isnot(None)
+
+
+def iter_survey_chunks(columns, *filters, chunk_size=DEFAULT_CHUNK_SIZE, start_after=0, with_offer=False):
+    """Yield lists of result rows ``(id, *columns)`` in ascending id order.
+
+    Only the requested columns are selected, so no ORM objects end up in
+    the identity map, and each chunk is fetched with a keyset condition
+    (``id > last id``) rather than an OFFSET. ``with_offer`` outer-joins the
+    job offer each survey applies to, for columns of JobOffer.
+    """
+    last_id = start_after
+    while True:
+        query = select(Survey.id, *columns)
+        if with_offer:
+            query = query.outerjoin(JobOffer, Survey.job_offer_id == JobOffer.id)
+        rows = db.session.execute(
+            query
+            .where(Survey.id > last_id, *filters)
+            .order_by(Survey.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def iter_training_chunks(*filters, chunk_size=DEFAULT_CHUNK_SIZE, dtype=np.float32):
+    """Yield ``(ids, X, y)`` arrays for labelled surveys, one chunk at a time; X is the raw input matrix"""
+    columns = raw_columns() + [Survey.success]
+    for rows in iter_survey_chunks(columns, labelled_filter(), *filters, chunk_size=chunk_size, with_offer=True):
+        chunk = np.array(rows, dtype=np.float64)
+        yield chunk[:, 0].astype(np.int64), chunk[:, 1:-1].astype(dtype), chunk[:, -1].astype(np.int8)
+
+
+def max_labelled_id():
+    """Highest id among labelled surveys, or 0 when there are none"""
+    return db.session.scalar(select(func.max(Survey.id)).where(labelled_filter())) or 0
+
+
+def load_training_matrix(*filters, chunk_size=DEFAULT_CHUNK_SIZE, dtype=np.float32):
+    """Read all labelled surveys into preallocated id, raw input and target arrays"""
+    total = db.session.scalar(
+        select(func.count(Survey.id)).where(labelled_filter(), *filters)
+    )
+    ids = np.empty(total, dtype=np.int64)
+    X = np.empty((total, len(RAW_COLUMNS)), dtype=dtype)
+    y = np.empty(total, dtype=np.int8)
+
+    filled = 0
+    for id_chunk, X_chunk, y_chunk in iter_training_chunks(*filters, chunk_size=chunk_size, dtype=dtype):
+        # Rows inserted after the count are left for the next training run
+        n = min(len(y_chunk), total - filled)
+        ids[filled:filled + n] = id_chunk[:n]
+        X[filled:filled + n] = X_chunk[:n]
+        y[filled:filled + n] = y_chunk[:n]
+        filled += n
+        if filled == total:
+            break
+
+    return ids[:filled], X[:filled], y[:filled]
@@ -0,0 +1,292 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from app.ml.model import FEATURE_COLUMNS, FEATURE_NAMES, INDUSTRIES, RAW_COLUMNS
+from app.ml.store import model_store
+
+
+class Numeric:
+    """A raw numeric column, passed through"""
+
+    kind = 'numeric'
+
+    def __init__(self, column, label):
+        self.column = column
+        self.labels = [label]
+
+    def transform(self, R, index, out):
+        out[:, 0] = R[:, index[self.column]]
+
+    def to_dict(self):
+        return {'kind': self.kind, 'column': self.column, 'label': self.labels[0]}
+
+
+class OneHot:
+    """One 0/1 column per category of a coded categorical column; missing codes are all zeros"""
+
+    kind = 'one_hot'
+
+    def __init__(self, column, label, categories=INDUSTRIES):
+        self.column = column
+        self.label = label
+        self.categories = list(categories)
+        self.labels = [f'{label}: {category}' for category in self.categories]
+
+    def transform(self, R, index, out):
+        codes = R[:, index[self.column]]
+        out[:] = 0.0
+        present = ~np.isnan(codes)
+        out[np.flatnonzero(present), np.rint(codes[present]).astype(np.int64)] = 1.0
+
+    def to_dict(self):
+        return {'kind': self.kind, 'column': self.column, 'label': self.label, 'categories': self.categories}
+
+
+class TargetEncoding:
+    """Smoothed success rate of each category of a coded categorical column.
+
+    Rates are shrunk towards the overall rate by ``smoothing`` pseudo-rows,
+    so rare categories do not get extreme values; a missing category gets
+    the overall rate. The rates are fitted on the training rows and stored
+    with the model version.
+    """
+
+    kind = 'target_encoding'
+
+    def __init__(self, column, label, categories=INDUSTRIES, smoothing=20.0, rates=None, prior=None):
+        self.column = column
+        self.labels = [label]
+        self.categories = list(categories)
+        self.smoothing = smoothing
+        self.rates = None if rates is None else np.asarray(rates, dtype=np.float64)
+        self.prior = prior
+        self._counts = np.zeros(len(self.categories))
+        self._successes = np.zeros(len(self.categories))
+
+    def partial_fit(self, R, y, index):
+        codes = R[:, index[self.column]]
+        present = ~np.isnan(codes)
+        codes = np.rint(codes[present]).astype(np.int64)
+        self._counts += np.bincount(codes, minlength=len(self.categories))
+        self._successes += np.bincount(codes, weights=np.asarray(y)[present], minlength=len(self.categories))
+
+    def finish_fit(self):
+        total = self._counts.sum()
+        self.prior = float(self._successes.sum() / total) if total else 0.5
+        self.rates = (self._successes + self.smoothing * self.prior) / (self._counts + self.smoothing)
+        self._counts = np.zeros(len(self.categories))
+        self._successes = np.zeros(len(self.categories))
+
+    def transform(self, R, index, out):
+        if self.rates is None:
+            raise ValueError(f'Target encoding of {self.column} is not fitted')
+        codes = R[:, index[self.column]]
+        present = ~np.isnan(codes)
+        out[:, 0] = self.prior
+        out[present, 0] = self.rates[np.rint(codes[present]).astype(np.int64)]
+
+    def to_dict(self):
+        return {'kind': self.kind, 'column': self.column, 'label': self.labels[0],
+                'categories': self.categories, 'smoothing': self.smoothing,
+                'rates': None if self.rates is None else self.rates.tolist(), 'prior': self.prior}
+
+
+class Difference:
+    """``left - right``, 0 when either side is missing (e.g. no job offer)"""
+
+    kind = 'difference'
+
+    def __init__(self, left, right, label):
+        self.left = left
+        self.right = right
+        self.labels = [label]
+
+    def transform(self, R, index, out):
+        out[:, 0] = np.nan_to_num(R[:, index[self.left]] - R[:, index[self.right]], nan=0.0)
+
+    def to_dict(self):
+        return {'kind': self.kind, 'left': self.left, 'right': self.right, 'label': self.labels[0]}
+
+
+class Match:
+    """1 when two coded categorical columns hold the same category, else 0"""
+
+    kind = 'match'
+
+    def __init__(self, left, right, label):
+        self.left = left
+        self.right = right
+        self.labels = [label]
+
+    def transform(self, R, index, out):
+        # Codes may come back from the prediction cache as e.g. 3.0000000000000004
+        out[:, 0] = np.rint(R[:, index[self.left]]) == np.rint(R[:, index[self.right]])
+
+    def to_dict(self):
+        return {'kind': self.kind, 'left': self.left, 'right': self.right, 'label': self.labels[0]}
+
+
+class Present:
+    """1 when a column has a value, else 0"""
+
+    kind = 'present'
+
+    def __init__(self, column, label):
+        self.column = column
+        self.labels = [label]
+
+    def transform(self, R, index, out):
+        out[:, 0] = ~np.isnan(R[:, index[self.column]])
+
+    def to_dict(self):
+        return {'kind': self.kind, 'column': self.column, 'label': self.labels[0]}
+
+
+FEATURE_KINDS = {kind.kind: kind for kind in (Numeric, OneHot, TargetEncoding, Difference, Match, Present)}
+
+
+def survey_features():
+    """The seven numeric survey columns, the only inputs of models trained before the pipeline"""
+    return [Numeric(column, name) for column, name in zip(FEATURE_COLUMNS, FEATURE_NAMES)]
+
+
+def default_features():
+    """Survey columns plus industry, offer industry and candidate-versus-offer gaps"""
+    return survey_features() + [
+        OneHot('industry', 'Industry'),
+        TargetEncoding('offer_industry', 'Offer Industry Success Rate'),
+        Difference('years_experience', 'offer_required_experience', 'Experience Gap'),
+        Difference('education_level', 'offer_education_level', 'Education Gap'),
+        Match('industry', 'offer_industry', 'Industry Match'),
+        Present('offer_industry', 'Applied to an Offer'),
+    ]
+
+
+class FeaturePipeline:
+    """Turns the raw input matrix (RAW_COLUMNS) into a model's feature matrix.
+
+    The pipeline is declared as a list of features and compiled once: each
+    feature gets its raw column indexes and its slice of the output, so a
+    transform is a fixed sequence of vectorized NumPy operations on the
+    whole batch. The fitted pipeline is stored in the model version's
+    manifest, and training, rescoring and serving all run the same one.
+    """
+
+    def __init__(self, features):
+        self.features = features
+        self.labels = [label for feature in features for label in feature.labels]
+        self.width = len(self.labels)
+        self._index = {column: i for i, column in enumerate(RAW_COLUMNS)}
+        self._slices = []
+        start = 0
+        for feature in features:
+            self._slices.append(slice(start, start + len(feature.labels)))
+            start += len(feature.labels)
+        # The first raw columns unchanged: single rows can skip the transform
+        self.passthrough = all(
+            feature.kind == 'numeric' and feature.column == RAW_COLUMNS[i] for i, feature in enumerate(features)
+        )
+
+    @classmethod
+    def default(cls):
+        return cls(default_features())
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a fitted pipeline from its manifest entry; versions without one used the survey columns"""
+        if data is None:
+            return cls(survey_features())
+        features = []
+        for spec in data:
+            spec = dict(spec)
+            features.append(FEATURE_KINDS[spec.pop('kind')](**spec))
+        return cls(features)
+
+    def to_dict(self):
+        return [feature.to_dict() for feature in self.features]
+
+    def partial_fit(self, R, y):
+        """Accumulate the statistics of fitted features (target encodings) over a chunk of rows"""
+        R = np.asarray(R, dtype=np.float64).reshape(-1, len(RAW_COLUMNS))
+        for feature in self.features:
+            if hasattr(feature, 'partial_fit'):
+                feature.partial_fit(R, y, self._index)
+
+    def finish_fit(self):
+        for feature in self.features:
+            if hasattr(feature, 'finish_fit'):
+                feature.finish_fit()
+
+    def fit(self, R, y):
+        self.partial_fit(R, y)
+        self.finish_fit()
+        return self
+
+    def transform(self, R):
+        """Feature matrix for a raw (n_samples, len(RAW_COLUMNS)) matrix"""
+        R = np.asarray(R, dtype=np.float64).reshape(-1, len(RAW_COLUMNS))
+        out = np.empty((len(R), self.width))
+        for feature, columns in zip(self.features, self._slices):
+            feature.transform(R, self._index, out[:, columns])
+        return out
+
+    def transform_row(self, values):
+        """Feature values for one raw row, as a list"""
+        if self.passthrough:
+            return list(values[:self.width])
+        return self.transform(np.array([values], dtype=np.float64))[0].tolist()
+
+
+class FeatureMatrixCache:
+    """Raw and feature matrices of the surveys a model version was trained on, one directory per version.
+
+    Written when the version is trained and memory-mapped by later jobs
+    (rescoring after a promote or rollback). A cached feature row is only
+    reused while the survey's raw row is unchanged, e.g. until its job offer
+    is edited. The model store removes an entry with its version.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def path(self, version):
+        return os.path.join(self.store.root, 'features', version)
+
+    def save(self, version, ids, R, X):
+        os.makedirs(os.path.dirname(self.path(version)), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(self.path(version)), prefix='.tmp-')
+        try:
+            np.save(os.path.join(tmp_dir, 'ids.npy'), np.asarray(ids, dtype=np.int64))
+            np.save(os.path.join(tmp_dir, 'R.npy'), np.asarray(R, dtype=np.float32))
+            np.save(os.path.join(tmp_dir, 'X.npy'), np.asarray(X, dtype=np.float64))
+            os.rename(tmp_dir, self.path(version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def load(self, version):
+        """``(ids, R, X)`` memory-mapped, ids ascending, or None when the version has no cached matrices"""
+        try:
+            return tuple(np.load(os.path.join(self.path(version), f'{name}.npy'), mmap_mode='r')
+                         for name in ('ids', 'R', 'X'))
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, cached, ids, R):
+        """Positions in ``cached`` of the rows whose ids and raw values match, and the mask of those rows"""
+        cached_ids, cached_R, _ = cached
+        if len(cached_ids) == 0:
+            return np.empty(0, dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        positions = np.searchsorted(cached_ids, ids).clip(max=len(cached_ids) - 1)
+        hit = cached_ids[positions] == ids
+        # Compared at the float32 precision the training rows were read with
+        R = np.asarray(R, dtype=np.float32)[hit]
+        old = cached_R[positions[hit]]
+        hit[hit] = ((old == R) | (np.isnan(old) & np.isnan(R))).all(axis=1)
+        return positions[hit], hit
+
+
+feature_cache = FeatureMatrixCache(model_store)
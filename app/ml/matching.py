@@ -0,0 +1,619 @@
+import os
+import threading
+
+import numpy as np
+from flask import current_app, has_request_context
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import aliased, joinedload
+
+from app import db
+from app.models.job_offer import JobOffer
+from app.models.match import JobMatch, MatchChange
+from app.models.survey import Survey
+from app.ml.dataset import DEFAULT_CHUNK_SIZE, feature_columns, industry_code_column, industry_filter, \
+    iter_survey_chunks
+from app.ml.model import FEATURE_COLUMNS, INDUSTRIES, RAW_COLUMNS
+
+# job_match.side of a survey's best offers and of an offer's best candidates
+SURVEY_SIDE = 'survey'
+OFFER_SIDE = 'offer'
+
+# match_change.kind: refresh one survey's or offer's matches, rank one survey's
+# or offer's list again, or recompute everything
+SURVEY_CHANGE = 'survey'
+OFFER_CHANGE = 'offer'
+SURVEY_LIST = 'survey_list'
+OFFER_LIST = 'offer_list'
+REBUILD = 'rebuild'
+
+# A pair row of the raw input matrix is a profile row (the survey columns and
+# industry) followed by an offer row (required experience, education, industry)
+PROFILE_WIDTH = len(FEATURE_COLUMNS) + 1
+PROFILE_EDUCATION = FEATURE_COLUMNS.index('education_level')
+PROFILE_INDUSTRY = RAW_COLUMNS.index('industry')
+OFFER_EDUCATION = 1
+
+
+def latest_survey_filter():
+    """SQL condition selecting each user's latest survey; that survey is the user's profile for matching.
+
+    It is a NOT EXISTS probe into the user's own surveys through the
+    user_id index, checked per candidate row, so chunked reads never
+    aggregate the whole survey table again.
+    """
+    newer = aliased(Survey)
+    return ~select(newer.id).where(newer.user_id == Survey.user_id, newer.id > Survey.id).exists()
+
+
+def load_profiles(*filters, chunk_size=DEFAULT_CHUNK_SIZE):
+    """``(ids, P)`` of the matching surveys, P holding the profile columns of the raw input matrix"""
+    columns = feature_columns() + [industry_code_column(Survey.industry_type)]
+    # Plain tuples: NumPy converts Row objects one attribute lookup at a time, about 20x slower
+    chunks = [np.array([tuple(row) for row in rows], dtype=np.float64)
+              for rows in iter_survey_chunks(columns, *filters, chunk_size=chunk_size)]
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty((0, PROFILE_WIDTH))
+    rows = np.concatenate(chunks)
+    return rows[:, 0].astype(np.int64), rows[:, 1:]
+
+
+def load_offers(*filters):
+    """``(ids, O)`` of the matching job offers, O holding the offer columns of the raw input matrix"""
+    rows = db.session.execute(
+        select(JobOffer.id, JobOffer.required_experience, JobOffer.education_level,
+               industry_code_column(JobOffer.industry_type))
+        .where(*filters)
+        .order_by(JobOffer.id)
+    ).all()
+    rows = np.array([tuple(row) for row in rows], dtype=np.float64).reshape(-1, 1 + len(RAW_COLUMNS) - PROFILE_WIDTH)
+    return rows[:, 0].astype(np.int64), rows[:, 1:]
+
+
+def queue_changes(kind, row_ids):
+    """Add match_change rows for ``row_ids``; the caller commits"""
+    if not len(row_ids):
+        return
+    db.session.execute(MatchChange.__table__.insert(), [{'kind': kind, 'row_id': row_id} for row_id in row_ids])
+
+
+def score_pairs(predictor, P, O, block=2 ** 18):
+    """Success probability of every (profile, offer) pair as an (n_profiles, n_offers) matrix.
+
+    Each block of profiles is paired with every offer by broadcasting into
+    one raw input matrix of at most about ``block`` rows, which is scored
+    with a single predict_matrix call.
+    """
+    n, m = len(P), len(O)
+    scores = np.empty((n, m))
+    rows_per_block = max(1, block // max(m, 1))
+    for start in range(0, n, rows_per_block):
+        profiles = P[start:start + rows_per_block]
+        R = np.empty((len(profiles), m, len(RAW_COLUMNS)))
+        R[:, :, :PROFILE_WIDTH] = profiles[:, None, :]
+        R[:, :, PROFILE_WIDTH:] = O[None, :, :]
+        scores[start:start + len(profiles)] = predictor.predict_matrix(
+            R.reshape(-1, len(RAW_COLUMNS))
+        ).reshape(len(profiles), m)
+    return scores
+
+
+def top_k(scores, k, axis=-1):
+    """Indices of the ``k`` highest scores along ``axis`` (unordered), or all when there are fewer"""
+    if scores.shape[axis] <= k:
+        shape = [1] * scores.ndim
+        shape[axis] = scores.shape[axis]
+        return np.broadcast_to(np.arange(scores.shape[axis]).reshape(shape), scores.shape)
+    return np.take(np.argpartition(-scores, k - 1, axis=axis), np.arange(k), axis=axis)
+
+
+class MatchingEngine:
+    """Top-K job offers for every profile and top-K profiles for every active offer.
+
+    A profile is a user's latest survey. Pairs are only scored when the
+    survey's industry is the offer's and its education level is at least
+    the offer's minus ``education_slack``; both sides are narrowed with
+    indexed SQL filters before anything is scored. Scores come from the
+    served model and are kept in the job_match table, so reads are one
+    index range scan. ``rebuild`` recomputes everything; ``refresh_survey``
+    and ``refresh_offer`` update the lists after one row changes, and
+    ``apply_changes`` runs them for the changes queued in match_change.
+    """
+
+    def __init__(self, top_k=20, education_slack=0, pair_block=2 ** 18, backfill_limit=50):
+        self.top_k = top_k
+        self.education_slack = education_slack
+        self.pair_block = pair_block
+        self.backfill_limit = backfill_limit
+
+    def init_app(self, app):
+        """Configure from MATCH_* settings"""
+        self.top_k = app.config.get('MATCH_TOP_K', 20)
+        self.education_slack = app.config.get('MATCH_EDUCATION_SLACK', 0)
+        self.pair_block = app.config.get('MATCH_PAIR_BLOCK', 2 ** 18)
+        self.backfill_limit = app.config.get('MATCH_BACKFILL_LIMIT', 50)
+
+    def predictor(self):
+        """The served model, without scoring a shadow version on every pair"""
+        from app.ml.registry import get_predictor
+        from app.ml.shadow import ShadowScorer
+
+        predictor = get_predictor()
+        return predictor.active if isinstance(predictor, ShadowScorer) else predictor
+
+    # Pre-filters
+
+    def offer_filters(self, industry, education):
+        """SQL conditions on the active offers a profile with this industry code and education can match"""
+        return [JobOffer.is_active == True, industry_filter(JobOffer.industry_type, industry),
+                JobOffer.education_level <= education + self.education_slack]
+
+    def profile_filters(self, industry, education):
+        """SQL conditions on the profiles an offer with this industry code and education can match"""
+        return [industry_filter(Survey.industry_type, industry),
+                Survey.education_level >= education - self.education_slack,
+                latest_survey_filter()]
+
+    # Reads
+
+    def offers_for_survey(self, survey_id, limit=None):
+        """``(JobOffer, score)`` rows best first for a survey"""
+        return db.session.query(JobOffer, JobMatch.score) \
+            .join(JobMatch, JobMatch.job_offer_id == JobOffer.id) \
+            .filter(JobMatch.side == SURVEY_SIDE, JobMatch.survey_id == survey_id, JobOffer.is_active == True) \
+            .order_by(JobMatch.score.desc(), JobOffer.id) \
+            .limit(limit or self.top_k).all()
+
+    def offers_for_user(self, user_id, limit=None):
+        """``(JobOffer, score)`` rows best first for a user's latest survey"""
+        survey_id = db.session.scalar(select(func.max(Survey.id)).where(Survey.user_id == user_id))
+        return self.offers_for_survey(survey_id, limit) if survey_id else []
+
+    def candidates_for_offer(self, offer_id, limit=None):
+        """``(Survey, score)`` rows best first for a job offer"""
+        return db.session.query(Survey, JobMatch.score) \
+            .join(JobMatch, JobMatch.survey_id == Survey.id) \
+            .options(joinedload(Survey.author)) \
+            .filter(JobMatch.side == OFFER_SIDE, JobMatch.job_offer_id == offer_id) \
+            .order_by(JobMatch.score.desc(), Survey.id) \
+            .limit(limit or self.top_k).all()
+
+    # Full rebuild
+
+    def rebuild(self, progress=None):
+        """Recompute every list from scratch, one industry at a time.
+
+        Offers and profiles of an industry are sorted by education level, so
+        each block of offers is only scored against the profiles that meet
+        its lowest requirement. Per block the scores are one matrix; each
+        offer's top K is taken from its column and each profile's running
+        top K is merged with its row. Each industry is replaced and
+        committed on its own, so the other industries keep serving their
+        lists meanwhile. ``progress`` is called as
+        ``progress(industry, profiles, offers)`` per industry. Returns
+        ``(rows written, pairs scored)``.
+        """
+        table = JobMatch.__table__
+        predictor = self.predictor()
+        k = self.top_k
+        written = scored = 0
+
+        for industry in range(len(INDUSTRIES)):
+            offers_query = select(JobOffer.id).where(industry_filter(JobOffer.industry_type, industry))
+            # Every pair is within one industry, so this clears both sides' lists
+            db.session.execute(table.delete().where(table.c.job_offer_id.in_(offers_query)))
+            offer_ids, O = load_offers(JobOffer.is_active == True, industry_filter(JobOffer.industry_type, industry))
+            if not len(offer_ids):
+                db.session.commit()
+                continue
+            profile_ids, P = load_profiles(industry_filter(Survey.industry_type, industry), latest_survey_filter())
+            if not len(profile_ids):
+                db.session.commit()
+                continue
+            if progress:
+                progress(INDUSTRIES[industry], len(profile_ids), len(offer_ids))
+
+            order = np.argsort(O[:, OFFER_EDUCATION], kind='stable')
+            offer_ids, O = offer_ids[order], O[order]
+            order = np.argsort(P[:, PROFILE_EDUCATION], kind='stable')
+            profile_ids, P = profile_ids[order], P[order]
+
+            best = np.full((len(P), k), -np.inf)
+            best_offers = np.full((len(P), k), -1, dtype=np.int64)
+            rows = []
+            step = max(1, self.pair_block // len(P))
+            for start in range(0, len(O), step):
+                block_ids, block = offer_ids[start:start + step], O[start:start + step]
+                first = np.searchsorted(P[:, PROFILE_EDUCATION],
+                                        block[:, OFFER_EDUCATION].min() - self.education_slack, 'left')
+                if first == len(P):
+                    continue
+                scores = score_pairs(predictor, P[first:], block, self.pair_block)
+                scored += scores.size
+                scores[P[first:, PROFILE_EDUCATION, None] < block[None, :, OFFER_EDUCATION] - self.education_slack] = -np.inf
+
+                top = top_k(scores, k, axis=0)
+                top_scores = np.take_along_axis(scores, top, axis=0)
+                for column, offer_id in enumerate(block_ids.tolist()):
+                    rows.extend(
+                        self._row(OFFER_SIDE, offer_id, survey_id, score)
+                        for survey_id, score in zip(profile_ids[first:][top[:, column]].tolist(),
+                                                    top_scores[:, column].tolist())
+                        if score > -np.inf
+                    )
+                if len(rows) >= DEFAULT_CHUNK_SIZE:
+                    written += self._insert(rows, predictor.version)
+                    rows = []
+
+                merged = np.concatenate([best[first:], scores], axis=1)
+                merged_offers = np.concatenate(
+                    [best_offers[first:], np.broadcast_to(block_ids, scores.shape)], axis=1
+                )
+                top = top_k(merged, k, axis=1)
+                best[first:] = np.take_along_axis(merged, top, axis=1)
+                best_offers[first:] = np.take_along_axis(merged_offers, top, axis=1)
+
+            for survey_id, offers, scores in zip(profile_ids.tolist(), best_offers.tolist(), best.tolist()):
+                rows.extend(
+                    self._row(SURVEY_SIDE, survey_id, offer_id, score)
+                    for offer_id, score in zip(offers, scores) if score > -np.inf
+                )
+                if len(rows) >= DEFAULT_CHUNK_SIZE:
+                    written += self._insert(rows, predictor.version)
+                    rows = []
+            written += self._insert(rows, predictor.version)
+            db.session.commit()
+
+        # Pairs of deactivated offers and superseded surveys left by earlier changes
+        db.session.execute(table.delete().where(
+            table.c.job_offer_id.notin_(select(JobOffer.id).where(JobOffer.is_active == True))
+            | table.c.survey_id.notin_(select(Survey.id).where(latest_survey_filter()))
+        ))
+        db.session.commit()
+        return written, scored
+
+    # Incremental refresh
+
+    def refresh_survey(self, survey_id):
+        """Update the lists after a survey was added or changed; the caller commits"""
+        survey = db.session.get(Survey, survey_id)
+        if survey is None:
+            self.remove_surveys([survey_id])
+            return
+        # The user's earlier surveys stop being profiles
+        older = db.session.scalars(select(Survey.id).where(
+            Survey.user_id == survey.user_id, Survey.id != survey_id
+        )).all()
+        newer = db.session.scalar(select(func.count(Survey.id)).where(
+            Survey.user_id == survey.user_id, Survey.id > survey_id
+        ))
+        if newer:
+            self.remove_surveys(older + [survey_id])
+            return
+        self.remove_surveys(older)
+
+        ranked = self._rank_survey(survey_id)
+        if ranked is not None:
+            self._update_other_side(OFFER_SIDE, survey_id, *ranked)
+
+    def refresh_offer(self, offer_id):
+        """Update the lists after an offer was added, changed, activated or deactivated; the caller commits"""
+        offer = db.session.get(JobOffer, offer_id)
+        if offer is None or not offer.is_active:
+            self.remove_offers([offer_id])
+            return
+        ranked = self._rank_offer(offer_id)
+        if ranked is not None:
+            self._update_other_side(SURVEY_SIDE, offer_id, *ranked)
+
+    def remove_surveys(self, survey_ids):
+        """Drop surveys from every list, refilling the offers' lists they were in; the caller commits"""
+        self._remove(JobMatch.survey_id, JobMatch.job_offer_id, OFFER_SIDE, survey_ids)
+
+    def remove_offers(self, offer_ids):
+        """Drop offers from every list, refilling the surveys' lists they were in; the caller commits"""
+        self._remove(JobMatch.job_offer_id, JobMatch.survey_id, SURVEY_SIDE, offer_ids)
+
+    def _remove(self, column, other_column, other_side, ids):
+        if not ids:
+            return
+        affected = db.session.scalars(
+            select(other_column.distinct()).where(JobMatch.side == other_side, column.in_(ids))
+        ).all()
+        # Naming both sides lets each side's index find the rows
+        db.session.execute(JobMatch.__table__.delete().where(
+            JobMatch.side.in_([SURVEY_SIDE, OFFER_SIDE]), column.in_(ids)
+        ))
+        self._rank_again(other_side, affected)
+
+    def _rank_survey(self, survey_id):
+        """Recompute a profile's best offers; returns the eligible offers' ``(ids, scores, id query)``"""
+        ids, P = load_profiles(Survey.id == survey_id, latest_survey_filter())
+        if not len(ids) or np.isnan(P[0, PROFILE_INDUSTRY]):
+            return None
+        filters = self.offer_filters(int(P[0, PROFILE_INDUSTRY]), P[0, PROFILE_EDUCATION])
+        offer_ids, O = load_offers(*filters)
+        scores = score_pairs(self.predictor(), P, O, self.pair_block)[0]
+        self._replace_list(SURVEY_SIDE, survey_id, offer_ids, scores)
+        return offer_ids, scores, select(JobOffer.id).where(*filters)
+
+    def _rank_offer(self, offer_id):
+        """Recompute an offer's best profiles; returns the eligible profiles' ``(ids, scores, id query)``"""
+        ids, O = load_offers(JobOffer.id == offer_id, JobOffer.is_active == True)
+        if not len(ids) or np.isnan(O[0, -1]):
+            return None
+        filters = self.profile_filters(int(O[0, -1]), O[0, OFFER_EDUCATION])
+        profile_ids, P = load_profiles(*filters)
+        scores = score_pairs(self.predictor(), P, O, self.pair_block)[:, 0]
+        self._replace_list(OFFER_SIDE, offer_id, profile_ids, scores)
+        return profile_ids, scores, select(Survey.id).where(*filters)
+
+    def _columns(self, side):
+        """(list owner column, listed column) of a side"""
+        table = JobMatch.__table__
+        if side == SURVEY_SIDE:
+            return table.c.survey_id, table.c.job_offer_id
+        return table.c.job_offer_id, table.c.survey_id
+
+    def _row(self, side, owner_id, listed_id, score):
+        if side == SURVEY_SIDE:
+            return {'side': side, 'survey_id': owner_id, 'job_offer_id': listed_id, 'score': score}
+        return {'side': side, 'survey_id': listed_id, 'job_offer_id': owner_id, 'score': score}
+
+    def _insert(self, rows, version):
+        """Bulk-insert job_match rows; returns how many"""
+        for row in rows:
+            row['model_version'] = version
+        for start in range(0, len(rows), DEFAULT_CHUNK_SIZE):
+            db.session.execute(JobMatch.__table__.insert(), rows[start:start + DEFAULT_CHUNK_SIZE])
+        return len(rows)
+
+    def _replace_list(self, side, owner_id, listed_ids, scores):
+        """Replace one owner's list with the top K of the given candidates"""
+        table = JobMatch.__table__
+        owner, _ = self._columns(side)
+        db.session.execute(table.delete().where(table.c.side == side, owner == owner_id))
+        top = top_k(scores, self.top_k)
+        self._insert([self._row(side, owner_id, listed_id, score)
+                      for listed_id, score in zip(listed_ids[top].tolist(), scores[top].tolist())],
+                     self.predictor().version)
+
+    def _update_other_side(self, side, listed_id, owner_ids, scores, owners_query):
+        """Put one survey or offer into the lists on ``side`` it now belongs to.
+
+        Lists that already hold it get the new score, or lose it when the
+        pair no longer passes the pre-filters. Other eligible lists take it
+        when they have fewer than K entries or it beats their lowest one,
+        which is then dropped. Lists it left or fell in may now miss an
+        unlisted candidate that beats it, so they are ranked again.
+        """
+        table = JobMatch.__table__
+        owner, listed = self._columns(side)
+        version = self.predictor().version
+
+        held = dict(db.session.execute(
+            select(owner, table.c.score).where(table.c.side == side, listed == listed_id)
+        ).all())
+        positions = {owner_id: i for i, owner_id in enumerate(owner_ids.tolist())}
+        gone = [owner_id for owner_id in held if owner_id not in positions]
+        if gone:
+            db.session.execute(table.delete().where(table.c.side == side, listed == listed_id, owner.in_(gone)))
+        kept = [owner_id for owner_id in held if owner_id in positions]
+        if kept:
+            db.session.execute(
+                table.update().where(table.c.side == side, owner == bindparam('owner'), listed == listed_id)
+                .values(score=bindparam('new_score'), model_version=version),
+                [{'owner': owner_id, 'new_score': float(scores[positions[owner_id]])} for owner_id in kept]
+            )
+        fell = [owner_id for owner_id in kept if scores[positions[owner_id]] < held[owner_id]]
+
+        state = db.session.execute(
+            select(owner, func.count(), func.min(table.c.score))
+            .where(table.c.side == side, owner.in_(owners_query))
+            .group_by(owner)
+        ).all()
+        counts = np.zeros(len(owner_ids), dtype=np.int64)
+        lowest = np.full(len(owner_ids), -np.inf)
+        for owner_id, count, score in state:
+            if owner_id in positions:
+                counts[positions[owner_id]], lowest[positions[owner_id]] = count, score
+        enters = (counts < self.top_k) | (scores > lowest)
+        enters[[positions[owner_id] for owner_id in kept]] = False
+        if enters.any():
+            self._insert([self._row(side, owner_id, listed_id, score)
+                          for owner_id, score in zip(owner_ids[enters].tolist(), scores[enters].tolist())],
+                         version)
+            full = owner_ids[enters & (counts >= self.top_k)].tolist()
+            if full:
+                lowest_listed = select(listed).where(table.c.side == side, owner == bindparam('owner')) \
+                    .order_by(table.c.score, listed).limit(1).scalar_subquery()
+                db.session.execute(
+                    table.delete().where(table.c.side == side, owner == bindparam('owner'), listed == lowest_listed),
+                    [{'owner': owner_id} for owner_id in full]
+                )
+
+        self._rank_again(side, gone + fell)
+
+    def _rank_again(self, side, owner_ids):
+        """Rank the first ``backfill_limit`` lists now and queue the rest; the caller commits"""
+        rank = self._rank_survey if side == SURVEY_SIDE else self._rank_offer
+        for owner_id in owner_ids[:self.backfill_limit]:
+            rank(owner_id)
+        queue_changes(SURVEY_LIST if side == SURVEY_SIDE else OFFER_LIST, owner_ids[self.backfill_limit:])
+
+    # Queued changes
+
+    def apply_changes(self, batch_size=500, progress=None):
+        """Apply the queued match_change rows, oldest first, until the queue is empty.
+
+        Repeated entries for one row are applied once. Each change is
+        committed together with the removal of its queue rows, so a failure
+        leaves it queued for the next run. A queued rebuild replaces every
+        change queued before it. ``progress`` is called after each change
+        and each rebuilt industry. Returns the number of changes applied.
+        """
+        table = MatchChange.__table__
+        applied = 0
+
+        rebuild_id = db.session.scalar(select(func.max(table.c.id)).where(table.c.kind == REBUILD))
+        if rebuild_id is not None:
+            self.rebuild(progress=progress and (lambda *args: progress()))
+            db.session.execute(table.delete().where(table.c.id <= rebuild_id))
+            db.session.commit()
+            applied += 1
+
+        refresh = {SURVEY_CHANGE: self.refresh_survey, OFFER_CHANGE: self.refresh_offer,
+                   SURVEY_LIST: self._rank_survey, OFFER_LIST: self._rank_offer}
+        while True:
+            changes = db.session.execute(
+                select(table.c.kind, table.c.row_id, func.max(table.c.id))
+                .where(table.c.kind.in_(refresh))
+                .group_by(table.c.kind, table.c.row_id)
+                .order_by(func.min(table.c.id))
+                .limit(batch_size)
+            ).all()
+            if not changes:
+                return applied
+            for kind, row_id, last_id in changes:
+                refresh[kind](row_id)
+                db.session.execute(table.delete().where(
+                    table.c.kind == kind, table.c.row_id == row_id, table.c.id <= last_id
+                ))
+                db.session.commit()
+                applied += 1
+                if progress:
+                    progress()
+
+
+class MatchWorker:
+    """Applies the queued match changes in a background thread.
+
+    Routes only queue a change and commit; ``notify`` then starts a thread
+    that drains the queue with MatchingEngine.apply_changes(). Only one
+    process drains at a time, guarded by a lock file in the instance
+    folder, which ``flask match refresh`` takes as well. Changes queued
+    while another process holds the lock are picked up by that process,
+    which checks the queue again after releasing it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = False
+
+    def notify(self):
+        """Start draining the queue in the background unless this process already is"""
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+
+        app = current_app._get_current_object()
+        thread = threading.Thread(target=self._run_in_background, args=(app,), daemon=True)
+        thread.start()
+        return True
+
+    def _run_in_background(self, app):
+        with app.app_context():
+            try:
+                self.drain()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Matching error: {str(e)}")
+            finally:
+                self._running = False
+
+    def drain(self, progress=None):
+        """Apply every queued change; returns how many, or None if another process is applying them"""
+        from app.ml.online import acquire_file_lock
+
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        lock_path = os.path.join(current_app.instance_path, 'match_queue.lock')
+        applied = None
+        while True:
+            if not acquire_file_lock(lock_path):
+                return applied
+
+            def touch():
+                # Keeps a long rebuild's lock from being taken for a stale one
+                os.utime(lock_path)
+                if progress:
+                    progress()
+
+            try:
+                applied = (applied or 0) + matching_engine.apply_changes(progress=touch)
+            finally:
+                os.remove(lock_path)
+            if not db.session.scalar(select(MatchChange.id).limit(1)):
+                return applied
+
+
+matching_engine = MatchingEngine()
+match_worker = MatchWorker()
+
+
+def notify_survey_changed(survey_id):
+    """Route hook: queue a refresh of a committed survey's matches when MATCH_ON_CHANGE is on"""
+    if current_app.config.get('MATCH_ON_CHANGE'):
+        _queue(SURVEY_CHANGE, [survey_id])
+
+
+def notify_offer_changed(offer_id):
+    """Route hook: queue a refresh of a committed job offer's matches when MATCH_ON_CHANGE is on"""
+    if current_app.config.get('MATCH_ON_CHANGE'):
+        _queue(OFFER_CHANGE, [offer_id])
+
+
+def notify_surveys_removed(survey_ids):
+    """Route hook: queue dropping deleted surveys from the matches when MATCH_ON_CHANGE is on"""
+    if current_app.config.get('MATCH_ON_CHANGE'):
+        _queue(SURVEY_CHANGE, survey_ids)
+
+
+def notify_offers_removed(offer_ids):
+    """Route hook: queue dropping deleted job offers from the matches when MATCH_ON_CHANGE is on"""
+    if current_app.config.get('MATCH_ON_CHANGE'):
+        _queue(OFFER_CHANGE, offer_ids)
+
+
+def notify_model_changed():
+    """Hook: queue a rebuild of every list after the served model changed when MATCH_ON_CHANGE is on"""
+    if current_app.config.get('MATCH_ON_CHANGE'):
+        _queue(REBUILD, [None])
+
+
+def _queue(kind, row_ids):
+    try:
+        queue_changes(kind, row_ids)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Matching error: {str(e)}")
+        return
+    # Commands apply the queue themselves rather than leave a thread behind
+    if current_app.config.get('MATCH_WORKER') and has_request_context():
+        match_worker.notify()
+
+
+def benchmark_refresh(samples=20, seed=42):
+    """Latency of the full incremental refresh, SQL included, on the configured database.
+
+    Refreshes up to ``samples`` random latest surveys and active offers,
+    flushing each one's writes and rolling them back, so nothing is
+    changed. Returns ``{'survey': seconds, 'offer': seconds}`` arrays.
+    """
+    import time
+
+    survey_ids = db.session.scalars(select(Survey.id).where(latest_survey_filter())).all()
+    offer_ids = db.session.scalars(select(JobOffer.id).where(JobOffer.is_active == True)).all()
+    rng = np.random.default_rng(seed)
+    timings = {}
+    for side, refresh, ids in ((SURVEY_SIDE, matching_engine.refresh_survey, survey_ids),
+                               (OFFER_SIDE, matching_engine.refresh_offer, offer_ids)):
+        seconds = []
+        for row_id in rng.permutation(ids)[:samples].tolist():
+            started = time.perf_counter()
+            refresh(row_id)
+            db.session.flush()
+            seconds.append(time.perf_counter() - started)
+            db.session.rollback()
+        timings[side] = np.array(seconds)
+    return timings
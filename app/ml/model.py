@@ -1,38 +1,154 @@
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, classification_report
-import joblib
-import os
+
+# scikit-learn is imported inside the methods that use it, so importing this
+# module for FEATURE_COLUMNS and friends stays cheap; the web tier serves
+# predictions with app.ml.scorer and never needs it
+
+# Survey attributes used as model inputs, in feature-matrix column order
+FEATURE_COLUMNS = [
+    'years_experience',
+    'education_level',
+    'num_skills',
+    'prev_job_changes',
+    'certifications',
+    'language_proficiency',
+    'interview_prep_score',
+]
+
+# Display names of FEATURE_COLUMNS, in the same order
+FEATURE_NAMES = [
+    'Years of Experience',
+    'Education Level',
+    'Number of Skills',
+    'Previous Job Changes',
+    'Certifications',
+    'Language Proficiency',
+    'Interview Preparation',
+]
+
+# Inclusive (min, max) accepted for each feature column, matching the survey and application forms
+FEATURE_BOUNDS = {
+    'years_experience': (0, 50),
+    'education_level': (1, 5),
+    'num_skills': (0, 100),
+    'prev_job_changes': (0, 50),
+    'certifications': (0, 50),
+    'language_proficiency': (0, 1),
+    'interview_prep_score': (0, 1),
+}
+
+# Industry categories. Surveys and job offers use different codes for the
+# same industry ('tech' and 'IT'), so both are mapped onto these.
+INDUSTRIES = ['tech', 'finance', 'healthcare', 'education', 'retail', 'manufacturing', 'other']
+INDUSTRY_ALIASES = {'it': 'tech'}
+
+# Inputs after FEATURE_COLUMNS in the raw matrix: the survey's industry and
+# the job offer it applies to. Industries are stored as indexes into
+# INDUSTRIES; the offer columns are NaN for surveys without an offer.
+CONTEXT_COLUMNS = ['industry', 'offer_required_experience', 'offer_education_level', 'offer_industry']
+RAW_COLUMNS = FEATURE_COLUMNS + CONTEXT_COLUMNS
+
+def industry_code(value):
+    """Index of an industry in INDUSTRIES, or None when there is no value"""
+    if not value:
+        return None
+    value = INDUSTRY_ALIASES.get(value.strip().lower(), value.strip().lower())
+    return INDUSTRIES.index(value if value in INDUSTRIES else 'other')
+
+def feature_matrix(surveys, job_offer=None):
+    """Build the raw (n_samples, len(RAW_COLUMNS)) input matrix from survey-like objects.
+
+    The offer columns come from ``job_offer`` if given, else from each
+    survey's ``job_offer`` attribute; objects without one leave them NaN.
+    """
+    rows = []
+    for survey in surveys:
+        offer = job_offer if job_offer is not None else getattr(survey, 'job_offer', None)
+        rows.append([getattr(survey, column) for column in FEATURE_COLUMNS] + [
+            industry_code(getattr(survey, 'industry_type', None)),
+            offer.required_experience if offer is not None else None,
+            offer.education_level if offer is not None else None,
+            industry_code(offer.industry_type) if offer is not None else None,
+        ])
+    return np.array(rows, dtype=float).reshape(-1, len(RAW_COLUMNS))
+
+def raw_matrix(X, industries=None):
+    """Raw input matrix from a (n_samples, 7) matrix of FEATURE_COLUMNS, without offer context"""
+    X = np.asarray(X, dtype=float).reshape(-1, len(FEATURE_COLUMNS))
+    R = np.full((len(X), len(RAW_COLUMNS)), np.nan)
+    R[:, :len(FEATURE_COLUMNS)] = X
+    if industries is not None:
+        R[:, RAW_COLUMNS.index('industry')] = [
+            np.nan if code is None else code for code in map(industry_code, industries)
+        ]
+    return R
+
+# Small hand-made dataset used until a model has been trained on real surveys
+BOOTSTRAP_FEATURES = np.array([
+    [5, 3, 5, 2, 2, 0.6, 0.8],  # Successful candidate
+    [1, 1, 2, 0, 0, 0.2, 0.3],  # Unsuccessful candidate
+    [3, 2, 4, 1, 1, 0.4, 0.6],  # Moderate success
+    [7, 4, 6, 3, 3, 0.8, 0.9],  # Very successful
+    [2, 2, 3, 1, 1, 0.4, 0.5],  # Moderate success
+])
+BOOTSTRAP_TARGETS = np.array([1, 0, 1, 1, 0])
+BOOTSTRAP_VERSION = 'bootstrap'
+
+# Target classes: 0 = unsuccessful, 1 = successful application
+CLASSES = np.array([0, 1])
+
+def publish_model(arrays, backend, model, activate=True, **fields):
+    """Publish fitted arrays to the model store with the manifest fields every backend records"""
+    from app.ml.store import model_store
+
+    manifest = {
+        'backend': backend,
+        'model': model,
+        'parent': None,
+        'n_samples': None,
+        'trained_through_id': None,
+        'metrics': {},
+        'params': {},
+        **fields,
+        'features': [
+            {'name': column, 'min': FEATURE_BOUNDS[column][0], 'max': FEATURE_BOUNDS[column][1]}
+            for column in FEATURE_COLUMNS
+        ],
+    }
+    return model_store.publish(arrays, manifest, activate=activate)
+
+def feature_importance(coefficients, names=FEATURE_NAMES):
+    """Absolute weight (coefficient or split gain) per feature name, largest first"""
+    importance = dict(zip(names, abs(coefficients)))
+    return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
 
 class JobSuccessPredictor:
-    def __init__(self):
-        self.model = LogisticRegression(random_state=42)
+    def __init__(self, incremental=False):
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+        from app.ml.features import FeaturePipeline
+
+        # SGD with log loss is a logistic regression that can be trained chunk by chunk
+        if incremental:
+            self.model = SGDClassifier(loss='log_loss', random_state=42)
+        else:
+            self.model = LogisticRegression(random_state=42)
         self.scaler = StandardScaler()
+        # Turns raw input rows (RAW_COLUMNS) into the model's features
+        self.pipeline = FeaturePipeline.default()
         self.is_trained = False
-        self.model_path = os.path.join(os.path.dirname(__file__), 'job_success_model.pkl')
-        self.scaler_path = os.path.join(os.path.dirname(__file__), 'scaler.pkl')
+        self.is_bootstrap = False
+        self.version = None
+        # Highest survey id the model has seen; newer labelled rows are folded in online
+        self.trained_through_id = None
+        # Number of surveys behind the published model, recorded in its manifest
+        self.n_samples = None
 
     def prepare_features(self, surveys):
         """Convert survey data to feature matrix"""
-        features = []
-        targets = []
-        
-        for survey in surveys:
-            feature_vector = [
-                survey.years_experience,
-                survey.education_level,
-                survey.num_skills,
-                survey.prev_job_changes,
-                survey.certifications,
-                survey.language_proficiency,
-                survey.interview_prep_score
-            ]
-            features.append(feature_vector)
-            targets.append(1 if survey.success else 0)
-        
-        return np.array(features), np.array(targets)
+        features = feature_matrix(surveys)
+        targets = np.array([1 if survey.success else 0 for survey in surveys])
+        return features, targets
 
     def train(self, surveys):
         """Train the model on survey data"""
@@ -41,15 +157,26 @@ class JobSuccessPredictor:
 
         # Prepare features and targets
         X, y = self.prepare_features(surveys)
-        
+        return self.fit_matrix(X, y)
+
+    def fit_matrix(self, X, y, activate=True):
+        """Train the model on an in-memory raw input matrix and save it"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, classification_report
+
+        if len(y) == 0:
+            raise ValueError("No training data provided")
+
         # Split the data
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42
         )
-        
-        # Scale the features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+
+        # Fit the pipeline on the training rows only, so target encodings
+        # do not see the evaluation rows
+        self.pipeline.fit(X_train, y_train)
+        X_train_scaled = self.scaler.fit_transform(self.pipeline.transform(X_train))
+        X_test_scaled = self.scaler.transform(self.pipeline.transform(X_test))
         
         # Train the model
         self.model.fit(X_train_scaled, y_train)
@@ -59,59 +186,159 @@ class JobSuccessPredictor:
         accuracy = accuracy_score(y_test, y_pred)
         report = classification_report(y_test, y_pred)
         
-        # Save the model and scaler
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.scaler, self.scaler_path)
-        
-        self.is_trained = True
+        self.save(n_samples=len(y), metrics={'accuracy': float(accuracy)}, activate=activate)
         return accuracy, report
 
+    def partial_fit_pipeline(self, X, y):
+        """Accumulate the pipeline's fitted statistics over a chunk of raw rows; call finish_fit after the last"""
+        self.pipeline.partial_fit(X, y)
+
+    def partial_fit_scaler(self, X):
+        """Update the scaler's running mean and variance with a chunk of raw rows"""
+        self.scaler.partial_fit(self.pipeline.transform(X))
+
+    def partial_fit(self, X, y):
+        """Fold a chunk of raw input rows into an incremental model"""
+        if not hasattr(self.model, 'partial_fit'):
+            raise ValueError("Model does not support incremental training")
+        self.model.partial_fit(self.scaler.transform(self.pipeline.transform(X)), y, classes=CLASSES)
+
+    def update(self, X, y):
+        """Fold a micro-batch of newly labelled rows into the trained model.
+
+        The scaler's running mean and variance are updated first and the
+        coefficients are re-expressed for the new scaling, so the existing
+        decision function is unchanged before the model takes an SGD step on
+        the batch. A LogisticRegression is replaced by an SGDClassifier
+        starting from the same coefficients on its first update.
+        """
+        if not self.is_trained:
+            self.load()
+
+        X = self.pipeline.transform(X)
+        old_mean, old_scale = self.scaler.mean_.copy(), self.scaler.scale_.copy()
+        self.scaler.partial_fit(X)
+        ratio = self.scaler.scale_ / old_scale
+        weights = self.model.coef_[0] / old_scale
+        coef = self.model.coef_ * ratio
+        intercept = self.model.intercept_ + np.dot(weights, self.scaler.mean_ - old_mean)
+        X_scaled = self.scaler.transform(X)
+
+        if not hasattr(self.model, 'partial_fit'):
+            from sklearn.linear_model import SGDClassifier
+            self.model = SGDClassifier(
+                loss='log_loss', learning_rate='constant', eta0=0.01, random_state=42
+            )
+        # partial_fit continues from the coefficients already set on the model
+        self.model.coef_, self.model.intercept_ = coef, intercept
+        self.model.partial_fit(X_scaled, y, classes=CLASSES)
+
+    def save(self, n_samples=None, metrics=None, params=None, activate=True):
+        """Publish the model as a new version in the model store, the active one unless ``activate`` is False"""
+        from app.ml.scorer import fold_scaling
+
+        coef, intercept = self.model.coef_[0], self.model.intercept_[0]
+        weights, bias = fold_scaling(self.scaler.mean_, self.scaler.scale_, coef, intercept)
+        arrays = {
+            'mean': self.scaler.mean_,
+            'var': self.scaler.var_,
+            'scale': self.scaler.scale_,
+            'coef': coef,
+            'intercept': [intercept],
+            'weights': weights,
+            'bias': [bias],
+        }
+        self.version = publish_model(
+            arrays, 'linear', type(self.model).__name__,
+            parent=self.version if self.is_trained and not self.is_bootstrap else None,
+            n_samples=n_samples,
+            scaler_samples_seen=int(np.max(self.scaler.n_samples_seen_)),
+            trained_through_id=self.trained_through_id,
+            metrics=metrics or {},
+            params=params or {},
+            pipeline=self.pipeline.to_dict(),
+            activate=activate,
+        )
+        self.n_samples = n_samples
+        self.is_trained = True
+        self.is_bootstrap = False
+
+    def export_scorer(self):
+        """NumPy-only LinearScorer with this model's fitted arrays"""
+        from app.ml.scorer import LinearScorer
+        return LinearScorer.from_predictor(self)
+
+    def fit_bootstrap(self):
+        """Fit the fallback model on the built-in synthetic data (not saved to disk)"""
+        from app.ml.features import FeaturePipeline
+
+        self.pipeline = FeaturePipeline.from_dict(None)
+        self.model.fit(self.scaler.fit_transform(BOOTSTRAP_FEATURES), BOOTSTRAP_TARGETS)
+        self.is_trained = True
+        self.is_bootstrap = True
+        self.version = BOOTSTRAP_VERSION
+
+    def load(self, version=None):
+        """Rebuild the model and scaler of the current (or given) store version"""
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+        from app.ml.features import FeaturePipeline
+        from app.ml.store import model_store
+
+        version = version or model_store.current_version()
+        if version is None:
+            raise ValueError("Model not trained yet")
+        manifest, arrays = model_store.load_arrays(version, mmap=False)
+        if manifest.get('backend', 'linear') != 'linear':
+            raise ValueError(f"Model version {version} is a {manifest['backend']} model, not a linear one")
+
+        pipeline = FeaturePipeline.from_dict(manifest.get('pipeline'))
+        scaler = StandardScaler()
+        scaler.mean_, scaler.var_, scaler.scale_ = arrays['mean'], arrays['var'], arrays['scale']
+        scaler.n_samples_seen_ = np.int64(manifest['scaler_samples_seen'])
+        scaler.n_features_in_ = pipeline.width
+
+        if manifest['model'] == 'SGDClassifier':
+            model = SGDClassifier(loss='log_loss', learning_rate='constant', eta0=0.01, random_state=42)
+        else:
+            model = LogisticRegression(random_state=42)
+        model.coef_ = arrays['coef'].reshape(1, -1)
+        model.intercept_ = arrays['intercept']
+        model.classes_ = CLASSES
+        model.n_features_in_ = pipeline.width
+
+        self.model, self.scaler, self.pipeline = model, scaler, pipeline
+        self.is_trained = True
+        self.is_bootstrap = False
+        self.version = version
+        self.trained_through_id = manifest.get('trained_through_id')
+        self.n_samples = manifest.get('n_samples')
+
     def predict(self, survey_data):
         """Predict success probability for new survey data"""
+        return self.predict_many([survey_data])[0]
+
+    def predict_many(self, surveys):
+        """Predict success probabilities for several surveys at once"""
+        return self.predict_matrix(feature_matrix(surveys))
+
+    def predict_matrix(self, X):
+        """Predict success probabilities for a raw (n_samples, len(RAW_COLUMNS)) input matrix"""
         if not self.is_trained:
-            if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-                self.is_trained = True
-            else:
-                raise ValueError("Model not trained yet")
-
-        # Prepare single survey data
-        features = np.array([[
-            survey_data.years_experience,
-            survey_data.education_level,
-            survey_data.num_skills,
-            survey_data.prev_job_changes,
-            survey_data.certifications,
-            survey_data.language_proficiency,
-            survey_data.interview_prep_score
-        ]])
-        
-        # Scale features
-        features_scaled = self.scaler.transform(features)
-        
-        # Get prediction probability
-        prob = self.model.predict_proba(features_scaled)[0][1]
-        return prob
+            self.load()
+
+        X = np.asarray(X, dtype=float).reshape(-1, len(RAW_COLUMNS))
+        if X.shape[0] == 0:
+            return np.empty(0)
+
+        # Transform, scale and score every row in one call
+        return self.model.predict_proba(self.scaler.transform(self.pipeline.transform(X)))[:, 1]
 
     def get_feature_importance(self):
         """Get the importance of each feature in the model"""
         if not self.is_trained:
             raise ValueError("Model not trained yet")
-            
-        feature_names = [
-            'Years of Experience',
-            'Education Level',
-            'Number of Skills',
-            'Previous Job Changes',
-            'Certifications',
-            'Language Proficiency',
-            'Interview Preparation'
-        ]
-        
-        coefficients = self.model.coef_[0]
-        importance = dict(zip(feature_names, abs(coefficients)))
-        return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
+        return feature_importance(self.model.coef_[0], self.pipeline.labels)
 
 def prepare_data(surveys):
     """Convert survey data to numpy arrays for training"""
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models.survey import Survey
+from app.ml.dataset import iter_training_chunks, labelled_filter, max_labelled_id
+from app.ml.model import JobSuccessPredictor
+from app.ml.store import model_store
+
+# A lock file older than this is assumed to be left over from a crashed update
+STALE_LOCK_SECONDS = 600
+
+
+class OnlineUpdater:
+    """Folds newly labelled surveys into the saved model in micro-batches.
+
+    The model remembers the highest survey id it was trained on
+    (``trained_through_id``); an update reads the labelled rows above that
+    id straight from the database, folds them in with
+    JobSuccessPredictor.update() and publishes a new version, which the registry in
+    every worker then picks up. Only one process updates at a time, guarded
+    by a lock file in the model store.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = False
+
+    def notify(self, batch_size):
+        """Start a background update once ``batch_size`` labelled surveys are newer than the served model.
+
+        The condition is counted in the database rather than per process, so
+        under several workers an update still starts after one batch of
+        submissions in total; the file lock lets only one of them run it.
+        """
+        from app.ml.registry import get_predictor
+
+        predictor = get_predictor()
+        if predictor.is_bootstrap:
+            return False
+        watermark = predictor.trained_through_id
+        if watermark is not None and unseen_labelled(watermark, batch_size) < batch_size:
+            return False
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+
+        app = current_app._get_current_object()
+        thread = threading.Thread(target=self._run_in_background, args=(app,), daemon=True)
+        thread.start()
+        return True
+
+    def _run_in_background(self, app):
+        with app.app_context():
+            try:
+                self.update()
+            except Exception as e:
+                print(f"Online model update error: {str(e)}")
+            finally:
+                self._running = False
+
+    def update(self, chunk_size=1000):
+        """Fold every labelled survey the saved model has not seen yet.
+
+        Returns the number of surveys folded in, or None if no trained model
+        exists or another process is already updating it.
+        """
+        predictor = JobSuccessPredictor()
+        os.makedirs(model_store.root, exist_ok=True)
+        lock_path = os.path.join(model_store.root, 'online_update.lock')
+        if not acquire_file_lock(lock_path):
+            return None
+
+        try:
+            try:
+                predictor.load()
+            except ValueError:
+                return None
+
+            if predictor.trained_through_id is None:
+                # Model saved without a watermark: start counting from now on
+                predictor.trained_through_id = max_labelled_id()
+                predictor.save(n_samples=predictor.n_samples)
+                return 0
+
+            folded = 0
+            for ids, X, y in iter_training_chunks(Survey.id > predictor.trained_through_id,
+                                                  chunk_size=chunk_size):
+                predictor.update(X, y)
+                predictor.trained_through_id = int(ids[-1])
+                folded += len(ids)
+
+            if folded:
+                predictor.save(n_samples=(predictor.n_samples or 0) + folded)
+            return folded
+        finally:
+            os.remove(lock_path)
+
+
+def unseen_labelled(watermark, limit):
+    """Labelled surveys with an id above ``watermark``, counting at most ``limit``"""
+    newer = select(Survey.id).where(labelled_filter(), Survey.id > watermark).limit(limit).subquery()
+    return db.session.scalar(select(func.count()).select_from(newer))
+
+
+online_updater = OnlineUpdater()
+
+
+def notify_new_survey(survey):
+    """Hook for newly committed surveys; only labelled ones count towards a batch"""
+    if survey.success is None or not current_app.config.get('ONLINE_LEARNING'):
+        return
+    online_updater.notify(current_app.config.get('ONLINE_UPDATE_BATCH_SIZE', 50))
+
+
+def acquire_file_lock(path):
+    """Create ``path`` exclusively, replacing a stale one; False if another process holds it"""
+    try:
+        if time.time() - os.path.getmtime(path) > STALE_LOCK_SECONDS:
+            os.remove(path)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
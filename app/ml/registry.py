@@ -0,0 +1,121 @@
+import threading
+import time
+
+from app.ml.model import JobSuccessPredictor
+from app.ml.scorer import load_scorer
+from app.ml.shadow import ShadowScorer, ShadowStats
+from app.ml.store import model_store
+
+
+class ModelRegistry:
+    """Keeps a single predictor in memory for the whole process.
+
+    The predictor is a NumPy-only scorer (app.ml.scorer) over the arrays of
+    the active model store version, memory-mapped so every worker shares one
+    copy; serving predictions never imports scikit-learn.
+
+    The store's CURRENT and SHADOW pointers are checked at most once every
+    ``check_interval`` seconds; when they name different versions, those are
+    loaded and swapped in with a single reference assignment. Only the
+    thread that does the check takes the lock: others keep using the
+    predictor they have instead of waiting for it, so a swap never stalls a
+    request. While no version is published, the predictor is fitted once on
+    the bootstrap data, so request handlers never have to fit anything.
+    """
+
+    def __init__(self, check_interval=2.0, store=model_store):
+        self.check_interval = check_interval
+        self.store = store
+        self._lock = threading.Lock()
+        self._predictor = None
+        self._active = None
+        self._version = None
+        self._shadow_version = None
+        self._last_check = 0.0
+        self.shadow_stats = None
+
+    def init_app(self, app):
+        """Configure how often the store pointers are checked from MODEL_RELOAD_INTERVAL"""
+        self.check_interval = app.config.get('MODEL_RELOAD_INTERVAL', 2.0)
+
+    def _load(self, version):
+        if version is not None:
+            try:
+                return load_scorer(self.store, version), version
+            except Exception as e:
+                # Keep serving the previous predictor and retry on the next check
+                print(f"Model reload error: {str(e)}")
+                if self._active is not None:
+                    return self._active, self._version
+        predictor = JobSuccessPredictor()
+        predictor.fit_bootstrap()
+        return predictor.export_scorer(), None
+
+    def _refresh(self):
+        version = self.store.current_version()
+        shadow_version = self.store.shadow_version()
+        if self._active is not None and version == self._version \
+                and shadow_version == self._shadow_version:
+            return
+
+        if self._active is None or version != self._version:
+            self._active, self._version = self._load(version)
+        predictor = self._active
+        if shadow_version is not None and shadow_version != self._version:
+            try:
+                shadow = load_scorer(self.store, shadow_version)
+                if self.shadow_stats is None or self.shadow_stats.version != shadow_version \
+                        or self.shadow_stats.active_version != self._version:
+                    self.shadow_stats = ShadowStats(shadow_version, self._version)
+                predictor = ShadowScorer(self._active, shadow, self.shadow_stats)
+            except Exception as e:
+                print(f"Shadow model load error: {str(e)}")
+        else:
+            self.shadow_stats = None
+        self._shadow_version = shadow_version
+        self._predictor = predictor
+
+    def get_predictor(self):
+        """Return the shared predictor, swapping in another version if one was activated"""
+        predictor = self._predictor
+        if predictor is not None and time.monotonic() - self._last_check < self.check_interval:
+            return predictor
+
+        # Another thread is already checking: keep serving the current predictor
+        if not self._lock.acquire(blocking=predictor is None):
+            return predictor
+        try:
+            if self._predictor is None or time.monotonic() - self._last_check >= self.check_interval:
+                self._refresh()
+                self._last_check = time.monotonic()
+            return self._predictor
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        """Force the next get_predictor() call to reload the active version"""
+        with self._lock:
+            self._predictor = None
+            self._active = None
+            self._version = None
+            self._shadow_version = None
+            self._last_check = 0.0
+
+
+registry = ModelRegistry()
+
+
+def get_predictor():
+    """Return the process-wide predictor (a NumPy-only scorer, wrapped in a ShadowScorer while shadowing)"""
+    return registry.get_predictor()
+
+
+def warm_up():
+    """Load the predictor before the first request.
+
+    Meant for the gunicorn master with preload_app (see gunicorn.conf.py):
+    workers forked afterwards share the loaded model copy-on-write instead
+    of each loading it on first use. scikit-learn is only imported here when
+    no model has been published yet.
+    """
+    return registry.get_predictor()
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, or_, select, update
+
+from app import db
+from app.models.survey import Survey
+from app.ml.dataset import DEFAULT_CHUNK_SIZE, iter_survey_chunks, raw_columns
+from app.ml.features import feature_cache
+from app.ml.registry import get_predictor
+
+
+def stale_filter(version):
+    """SQL condition matching surveys not yet scored by the given model version"""
+    return or_(Survey.model_version.is_(None), Survey.model_version != version)
+
+
+def score_chunk(predictor, ids, R, cached=None):
+    """Score raw rows, reusing the version's cached feature rows where the raw rows are unchanged"""
+    if cached is None or not hasattr(predictor, 'predict_features'):
+        return predictor.predict_matrix(R)
+    positions, hit = feature_cache.lookup(cached, ids, R)
+    probabilities = np.empty(len(ids))
+    probabilities[hit] = predictor.predict_features(cached[2][positions])
+    probabilities[~hit] = predictor.predict_matrix(R[~hit])
+    return probabilities
+
+
+def rescore_surveys(predictor=None, chunk_size=DEFAULT_CHUNK_SIZE, start_after=0,
+                    rescore_all=False, progress=None):
+    """Re-score stored predictions in keyset-paginated chunks.
+
+    Rows are read by ascending id, ``chunk_size`` at a time, with only the id
+    and raw input columns selected. Rows the version was trained on reuse
+    its cached feature matrix instead of being transformed again. Each chunk is scored with one vectorized
+    call and written back with a single executemany UPDATE, then committed,
+    so an interrupted run keeps everything finished so far. Unless
+    ``rescore_all`` is set, rows already carrying the current model version
+    are skipped, which makes simply re-running the job resume it.
+
+    ``progress`` is called as ``progress(done, total, last_id)`` after every chunk.
+    Returns the number of rows updated.
+    """
+    predictor = predictor or get_predictor()
+    version = predictor.version
+
+    filters = [] if rescore_all else [stale_filter(version)]
+    total = db.session.scalar(
+        select(func.count(Survey.id)).where(Survey.id > start_after, *filters)
+    )
+
+    cached = feature_cache.load(version) if version else None
+    done = 0
+    last_id = start_after
+    for rows in iter_survey_chunks(raw_columns(), *filters, chunk_size=chunk_size,
+                                   start_after=start_after, with_offer=True):
+        chunk = np.array(rows, dtype=float)
+        probabilities = score_chunk(predictor, chunk[:, 0].astype(np.int64), chunk[:, 1:], cached)
+        db.session.execute(update(Survey), [
+            {'id': row[0], 'success_probability': float(probability), 'model_version': version}
+            for row, probability in zip(rows, probabilities)
+        ])
+        db.session.commit()
+
+        done += len(rows)
+        last_id = rows[-1][0]
+        if progress:
+            progress(done, total, last_id)
+
+    return done
+
+
+def launch_rescore():
+    """Start `flask ml rescore` in a separate process so web workers are not blocked"""
+    return subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'app:create_app', 'ml', 'rescore'],
+        cwd=os.path.dirname(current_app.root_path),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
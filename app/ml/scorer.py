@@ -0,0 +1,320 @@
+import math
+
+import numpy as np
+
+from app.ml.features import FeaturePipeline
+from app.ml.model import FEATURE_COLUMNS, RAW_COLUMNS, feature_importance, feature_matrix
+
+
+def raw_row(values):
+    """A raw input row padded with missing values when only the survey columns are given"""
+    return list(values) + [math.nan] * (len(RAW_COLUMNS) - len(values))
+
+
+def fold_scaling(mean, scale, coef, intercept):
+    """Weights and bias that apply the standardization and the linear model in one step"""
+    weights = np.asarray(coef, dtype=np.float64) / np.asarray(scale, dtype=np.float64)
+    return weights, float(intercept) - float(np.dot(weights, mean))
+
+
+class LinearScorer:
+    """NumPy-only copy of a fitted StandardScaler + logistic regression.
+
+    The standardization is folded into the weights,
+    ((x - mean) / scale) . coef + b == x . (coef / scale) + (b - mean . coef / scale),
+    so scoring is one dot product and a sigmoid, without importing scikit-learn.
+    Exposes the prediction interface of JobSuccessPredictor.
+    """
+
+    def __init__(self, mean, scale, coef, intercept, version=None, trained_through_id=None,
+                 is_bootstrap=False, weights=None, bias=None, pipeline=None):
+        self.pipeline = pipeline or FeaturePipeline.from_dict(None)
+        # asarray keeps memory-mapped arrays from the model store mapped
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        if not self.mean.shape == self.scale.shape == self.coef.shape == (self.pipeline.width,):
+            raise ValueError(f'Expected {self.pipeline.width} values per array')
+
+        if weights is None:
+            weights, bias = fold_scaling(self.mean, self.scale, self.coef, self.intercept)
+        self.weights = weights
+        self.bias = bias
+        # Plain floats for the single-row path, which is faster without NumPy
+        self._row_weights = self.weights.tolist()
+
+        self.version = version
+        self.trained_through_id = trained_through_id
+        self.is_trained = True
+        self.is_bootstrap = is_bootstrap
+
+    @classmethod
+    def from_predictor(cls, predictor):
+        """Export the fitted arrays of a trained JobSuccessPredictor"""
+        return cls(
+            predictor.scaler.mean_,
+            predictor.scaler.scale_,
+            predictor.model.coef_[0],
+            predictor.model.intercept_[0],
+            version=predictor.version,
+            trained_through_id=predictor.trained_through_id,
+            is_bootstrap=predictor.is_bootstrap,
+            pipeline=predictor.pipeline,
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays, manifest, version=None):
+        """Build from the arrays of a published version"""
+        return cls(
+            arrays['mean'], arrays['scale'], arrays['coef'], float(arrays['intercept'][0]),
+            version=version,
+            trained_through_id=manifest.get('trained_through_id'),
+            weights=arrays['weights'],
+            bias=float(arrays['bias'][0]),
+            pipeline=FeaturePipeline.from_dict(manifest.get('pipeline')),
+        )
+
+    def predict_row(self, values):
+        """Success probability for one raw input row (RAW_COLUMNS, or at least the survey columns)"""
+        if not self.pipeline.passthrough:
+            values = self.pipeline.transform_row(raw_row(values))
+        z = self.bias
+        for weight, value in zip(self._row_weights, values):
+            z += weight * value
+        # Same as 1 / (1 + exp(-z)) without overflowing for large |z|
+        return 0.5 * (1.0 + math.tanh(0.5 * z))
+
+    def predict(self, survey_data):
+        """Predict success probability for new survey data"""
+        if self.pipeline.passthrough:
+            return self.predict_row([float(getattr(survey_data, column)) for column in FEATURE_COLUMNS])
+        return float(self.predict_matrix(feature_matrix([survey_data]))[0])
+
+    def predict_many(self, surveys):
+        """Predict success probabilities for several surveys at once"""
+        return self.predict_matrix(feature_matrix(surveys))
+
+    def predict_matrix(self, X):
+        """Predict success probabilities for a raw (n_samples, len(RAW_COLUMNS)) input matrix"""
+        return self.predict_features(self.pipeline.transform(X))
+
+    def predict_features(self, X):
+        """Predict success probabilities for rows already transformed by the pipeline"""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.pipeline.width)
+        return 0.5 * (1.0 + np.tanh(0.5 * (X @ self.weights + self.bias)))
+
+    def get_feature_importance(self):
+        """Get the importance of each feature in the model"""
+        return feature_importance(self.coef, self.pipeline.labels)
+
+
+class TreeEnsembleScorer:
+    """NumPy-only copy of a fitted HistGradientBoostingClassifier.
+
+    Every node of every tree is one entry in flat arrays (leaves have
+    feature -1). A batch is scored with leaf bitmasks (QuickScorer): the
+    leaves of each tree are numbered left to right, and a split a row fails
+    (value above the threshold) rules out the leaves of its left subtree,
+    so the row reaches the lowest leaf no failed split rules out. Per
+    feature, the splits a value fails are a prefix of the splits sorted by
+    threshold, so one binary search and one row of a precomputed table
+    give that feature's masks for all trees at once. Trees with more than
+    64 leaves are walked instead, one tree level per step for all rows.
+    The raw score is the baseline plus the reached leaf values, which
+    already include the learning rate.
+    """
+
+    # Rows per block of a batch, so the (rows, trees) masks stay in cache
+    BLOCK_ROWS = 2048
+
+    def __init__(self, baseline, roots, depths, feature, threshold, left, right, value, missing_left, gain,
+                 version=None, trained_through_id=None, pipeline=None):
+        self.pipeline = pipeline or FeaturePipeline.from_dict(None)
+        self.baseline = float(baseline)
+        self.feature = np.asarray(feature, dtype=np.int64)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.gain = np.asarray(gain, dtype=np.float64)
+        self.missing_left = np.asarray(missing_left, dtype=bool)
+        threshold = np.asarray(threshold, dtype=np.float64)
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+
+        leaf = self.feature < 0
+        nodes = np.arange(len(leaf))
+        self._split_feature = np.where(leaf, 0, self.feature).astype(np.int32)
+        self._split_threshold = np.where(leaf, np.inf, threshold)
+        # children[2 * node + goes_left]; a leaf is its own child
+        self._children = np.empty(2 * len(leaf), dtype=np.int32)
+        self._children[0::2] = np.where(leaf, nodes, right)
+        self._children[1::2] = np.where(leaf, nodes, left)
+
+        depths = np.asarray(depths, dtype=np.int64)
+        order = np.argsort(-depths, kind='stable')
+        self._sorted_roots = np.asarray(roots, dtype=np.int32)[order]
+        # Number of trees still deeper than each level
+        self._deeper = [int(np.count_nonzero(depths > level)) for level in range(int(depths.max(initial=0)))]
+
+        # Plain lists for the single-row path, which is faster without NumPy
+        self._nodes = list(zip(self.feature.tolist(), threshold.tolist(), left.tolist(),
+                               right.tolist(), self.value.tolist(), self.missing_left.tolist()))
+        self._roots = np.asarray(roots, dtype=np.int64).tolist()
+        # Built on the first batch, so loading a version stays constant time
+        self._masks = None
+
+        self.version = version
+        self.trained_through_id = trained_through_id
+        self.is_trained = True
+        self.is_bootstrap = False
+
+    @classmethod
+    def from_arrays(cls, arrays, manifest, version=None):
+        """Build from the arrays of a published version"""
+        return cls(
+            arrays['baseline'][0], arrays['roots'], arrays['depths'], arrays['feature'], arrays['threshold'],
+            arrays['left'], arrays['right'], arrays['value'], arrays['missing_left'], arrays['gain'],
+            version=version,
+            trained_through_id=manifest.get('trained_through_id'),
+            pipeline=FeaturePipeline.from_dict(manifest.get('pipeline')),
+        )
+
+    def predict_row(self, values):
+        """Success probability for one raw input row (RAW_COLUMNS, or at least the survey columns)"""
+        if not self.pipeline.passthrough:
+            values = self.pipeline.transform_row(raw_row(values))
+        nodes = self._nodes
+        z = self.baseline
+        for node in self._roots:
+            feature, threshold, left, right, value, missing_left = nodes[node]
+            while feature >= 0:
+                x = values[feature]
+                node = left if x <= threshold or (x != x and missing_left) else right
+                feature, threshold, left, right, value, missing_left = nodes[node]
+            z += value
+        return 0.5 * (1.0 + math.tanh(0.5 * z))
+
+    def predict(self, survey_data):
+        """Predict success probability for new survey data"""
+        if self.pipeline.passthrough:
+            return self.predict_row([float(getattr(survey_data, column)) for column in FEATURE_COLUMNS])
+        return float(self.predict_matrix(feature_matrix([survey_data]))[0])
+
+    def predict_many(self, surveys):
+        """Predict success probabilities for several surveys at once"""
+        return self.predict_matrix(feature_matrix(surveys))
+
+    def predict_matrix(self, X):
+        """Predict success probabilities for a raw (n_samples, len(RAW_COLUMNS)) input matrix"""
+        return self.predict_features(self.pipeline.transform(X))
+
+    def predict_features(self, X):
+        """Predict success probabilities for rows already transformed by the pipeline"""
+        X = np.ascontiguousarray(X, dtype=np.float64).reshape(-1, self.pipeline.width)
+        if self._masks is None:
+            self._masks = self._mask_tables() or False
+        if self._masks:
+            z = np.concatenate([self._raw_scores_by_masks(X[start:start + self.BLOCK_ROWS])
+                                for start in range(0, len(X), self.BLOCK_ROWS)] or [np.empty(0)])
+        else:
+            z = self._raw_scores_by_levels(X)
+        return 0.5 * (1.0 + np.tanh(0.5 * (self.baseline + z)))
+
+    def _mask_tables(self):
+        """``(features, thresholds, tables, leaf values)`` for scoring by leaf bitmasks, or None over 64 leaves.
+
+        Row ``k`` of a feature's table holds, per tree, the leaves left after
+        failing the first ``k`` of the feature's splits by threshold; its
+        last row is for a missing value, which fails the splits that do not
+        send missing values left.
+        """
+        nodes = self._nodes
+        leaf_values = np.zeros((len(self._roots), 64))
+        ruled_out = {}
+
+        for tree, root in enumerate(self._roots):
+            leaves = 0
+            stack = [(root, None)]
+            while stack:
+                node, first_left_leaf = stack.pop()
+                feature, _, left, right, value, _ = nodes[node]
+                if feature < 0:
+                    if leaves == 64:
+                        return None
+                    leaf_values[tree, leaves] = value
+                    leaves += 1
+                elif first_left_leaf is None:
+                    # Come back to the split once its left subtree is numbered
+                    stack.append((node, leaves))
+                    stack.append((left, None))
+                else:
+                    ruled_out[node] = (tree, (1 << leaves) - (1 << first_left_leaf))
+                    stack.append((right, None))
+
+        features, thresholds, tables = [], [], []
+        for feature in sorted({nodes[node][0] for node in ruled_out}):
+            splits = sorted((nodes[node][1], node) for node in ruled_out if nodes[node][0] == feature)
+            ruled = np.zeros((len(splits) + 2, len(self._roots)), dtype=np.uint64)
+            for row, (_, node) in enumerate(splits, start=1):
+                tree, mask = ruled_out[node]
+                ruled[row, tree] = mask
+                if not nodes[node][5]:
+                    ruled[-1, tree] |= np.uint64(mask)
+            ruled[:-1] = np.bitwise_or.accumulate(ruled[:-1], axis=0)
+            features.append(feature)
+            thresholds.append(np.array([threshold for threshold, _ in splits]))
+            tables.append(~ruled)
+        return features, thresholds, tables, leaf_values
+
+    def _raw_scores_by_masks(self, X):
+        features, thresholds, tables, leaf_values = self._masks
+        reached = np.full((len(X), len(leaf_values)), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for feature, threshold, table in zip(features, thresholds, tables):
+            x = X[:, feature]
+            failed = np.searchsorted(threshold, x, 'left')
+            missing = np.isnan(x)
+            if missing.any():
+                failed[missing] = len(table) - 1
+            reached &= table[failed]
+        # Index of the lowest set bit: isolate it, then read its float exponent
+        lowest = reached & (~reached + np.uint64(1))
+        leaf = np.frexp(lowest.astype(np.float64))[1] - 1
+        return leaf_values[np.arange(len(leaf_values)), leaf].sum(axis=1)
+
+    def _raw_scores_by_levels(self, X):
+        values = X.ravel()
+        row_starts = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        has_missing = np.isnan(values).any()
+
+        node = np.repeat(self._sorted_roots[None, :], len(X), axis=0)
+        for deeper in self._deeper:
+            current = node[:, :deeper]
+            x = values[row_starts + self._split_feature[current]]
+            goes_left = x <= self._split_threshold[current]
+            if has_missing:
+                goes_left |= np.isnan(x) & self.missing_left[current]
+            node[:, :deeper] = self._children[2 * current + goes_left]
+        return self.value[node].sum(axis=1)
+
+    def get_feature_importance(self):
+        """Share of the total split gain per feature, so the values add up to 1"""
+        splits = self.feature >= 0
+        gains = np.bincount(self.feature[splits], weights=self.gain[splits], minlength=self.pipeline.width)
+        return feature_importance(gains / gains.sum() if gains.sum() > 0 else gains, self.pipeline.labels)
+
+
+# NumPy-only scorer for each model backend, by the name recorded in the manifest
+SCORERS = {
+    'linear': LinearScorer,
+    'hist_gradient_boosting': TreeEnsembleScorer,
+}
+
+
+def load_scorer(store, version):
+    """Load a published version, with its arrays memory-mapped from the store"""
+    manifest, arrays = store.load_arrays(version)
+    if [feature['name'] for feature in manifest['features']] != FEATURE_COLUMNS:
+        raise ValueError('Model was trained on different feature columns')
+    backend = manifest.get('backend', 'linear')
+    if backend not in SCORERS:
+        raise ValueError(f'Unknown model backend {backend}')
+    return SCORERS[backend].from_arrays(arrays, manifest, version)
@@ -0,0 +1,31 @@
+from app import db
+from app.ml.registry import get_predictor
+
+
+def score_surveys(surveys, predictor=None):
+    """Compute and store success_probability/model_version on the given surveys.
+
+    The rows are scored in one batch; the caller is responsible for committing.
+    """
+    if not surveys:
+        return surveys
+    predictor = predictor or get_predictor()
+    probabilities = predictor.predict_many(surveys)
+    for survey, probability in zip(surveys, probabilities):
+        survey.success_probability = float(probability)
+        survey.model_version = predictor.version
+    return surveys
+
+
+def ensure_scores(surveys, predictor=None):
+    """Score and persist any of the given surveys that have no stored score yet"""
+    unscored = [survey for survey in surveys if survey.success_probability is None]
+    if unscored:
+        try:
+            score_surveys(unscored, predictor)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Prediction error: {str(e)}")
+    return surveys
+
@@ -0,0 +1,204 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Hyperparameters tried by default: regularization strength, class weights and solver
+DEFAULT_PARAM_GRID = {
+    'C': [0.01, 0.1, 1.0, 10.0],
+    'class_weight': [None, 'balanced'],
+    'solver': ['lbfgs', 'liblinear'],
+}
+
+# Arrays attached from shared memory in each pool process, by name
+_shared = {}
+
+
+def param_combinations(grid):
+    """Every combination of the grid's values, as a list of parameter dicts"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def stratified_folds(y, folds, seed=42):
+    """Fold number of every row, with each class spread evenly over the folds"""
+    from sklearn.model_selection import StratifiedKFold
+
+    counts = np.bincount(y, minlength=2)
+    if counts.min() < folds:
+        raise ValueError(f'Every class needs at least {folds} surveys for {folds}-fold cross-validation')
+    assignment = np.empty(len(y), dtype=np.int8)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    for fold, (_, test_index) in enumerate(splitter.split(np.zeros(len(y)), y)):
+        assignment[test_index] = fold
+    return assignment
+
+
+class SharedArrays:
+    """Copies arrays into shared memory once so pool processes read them without pickling.
+
+    ``specs`` (name -> (segment name, shape, dtype)) is all a process needs
+    to attach; use as a context manager so the segments are always freed.
+    """
+
+    def __init__(self, **arrays):
+        self.segments = {}
+        self.specs = {}
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+                self.segments[name] = segment
+                self.specs[name] = (segment.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        for segment in self.segments.values():
+            segment.close()
+            segment.unlink()
+        self.segments = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _attach(specs):
+    for name, (segment_name, shape, dtype) in specs.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _shared[name] = (segment, np.ndarray(shape, dtype=dtype, buffer=segment.buf))
+
+
+def _detach():
+    for name in list(_shared):
+        segment, array = _shared.pop(name)
+        # The view must go before the mapping can be closed
+        del array
+        segment.close()
+
+
+def _init_worker(specs):
+    """Pool initializer: map the shared arrays and keep BLAS to one thread per process"""
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(1)
+    _attach(specs)
+
+
+def _evaluate(params, fold):
+    """Fit on every fold but ``fold`` and score on ``fold``; runs in a pool process"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score, log_loss
+    from sklearn.preprocessing import StandardScaler
+    from app.ml.features import FeaturePipeline
+
+    X, y, assignment = _shared['X'][1], _shared['y'][1], _shared['folds'][1]
+    train, test = assignment != fold, assignment == fold
+
+    started = time.perf_counter()
+    # The pipeline is fitted per fold so target encodings never see the scored rows
+    pipeline = FeaturePipeline.default().fit(X[train], y[train])
+    scaler = StandardScaler()
+    model = LogisticRegression(random_state=42, max_iter=1000, **params)
+    model.fit(scaler.fit_transform(pipeline.transform(X[train])), y[train])
+    probabilities = model.predict_proba(scaler.transform(pipeline.transform(X[test])))
+    return {
+        'accuracy': accuracy_score(y[test], probabilities.argmax(axis=1)),
+        'log_loss': log_loss(y[test], probabilities, labels=[0, 1]),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def run_search(shared, candidates, folds, jobs):
+    """Evaluate every candidate on every fold in ``jobs`` processes.
+
+    Returns one result per candidate with the fold means, best first
+    (highest accuracy, then lowest log loss), and the wall-clock seconds.
+    """
+    tasks = [(params, fold) for params in candidates for fold in range(folds)]
+    started = time.perf_counter()
+    if jobs == 1:
+        from threadpoolctl import threadpool_limits
+
+        _attach(shared.specs)
+        try:
+            with threadpool_limits(1):
+                scores = [_evaluate(params, fold) for params, fold in tasks]
+        finally:
+            _detach()
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(shared.specs,)) as pool:
+            scores = list(pool.map(_evaluate, *zip(*tasks)))
+    elapsed = time.perf_counter() - started
+
+    results = []
+    for index, params in enumerate(candidates):
+        fold_scores = scores[index * folds:(index + 1) * folds]
+        results.append({
+            'params': params,
+            'accuracy': float(np.mean([score['accuracy'] for score in fold_scores])),
+            'accuracy_std': float(np.std([score['accuracy'] for score in fold_scores])),
+            'log_loss': float(np.mean([score['log_loss'] for score in fold_scores])),
+            'fit_seconds': float(sum(score['seconds'] for score in fold_scores)),
+        })
+    results.sort(key=lambda result: (-result['accuracy'], result['log_loss']))
+    return results, elapsed
+
+
+def scaling_report(shared, candidates, folds, max_jobs):
+    """Wall-clock time of the same search with 1, 2, 4, ... up to ``max_jobs`` processes.
+
+    Returns ``(jobs, seconds, speedup, efficiency)`` rows relative to one process.
+    """
+    counts = sorted({min(2 ** power, max_jobs) for power in range(max_jobs.bit_length() + 1)})
+    rows = []
+    for jobs in counts:
+        _, seconds = run_search(shared, candidates, folds, jobs)
+        speedup = rows[0][1] / seconds if rows else 1.0
+        rows.append((jobs, seconds, speedup, speedup / jobs))
+    return rows
+
+
+def search_and_train(X, y, folds=5, jobs=None, grid=None, trained_through_id=None,
+                     activate=True, scaling=False):
+    """Cross-validate the parameter grid in parallel, then refit the best on all rows and save it.
+
+    ``X`` is the raw input matrix (RAW_COLUMNS). ``X`` and ``y`` are copied
+    into shared memory once; every pool process maps them instead of
+    receiving its own pickled copy. Returns
+    ``(predictor, results, elapsed, scaling_rows)``; ``scaling_rows`` is
+    None unless ``scaling`` is set.
+    """
+    from app.ml.model import JobSuccessPredictor
+
+    if len(y) == 0:
+        raise ValueError("No training data provided")
+    jobs = jobs or os.cpu_count() or 1
+    candidates = param_combinations(grid or DEFAULT_PARAM_GRID)
+
+    with SharedArrays(X=X, y=y, folds=stratified_folds(y, folds)) as shared:
+        results, elapsed = run_search(shared, candidates, folds, jobs)
+        scaling_rows = scaling_report(shared, candidates, folds, jobs) if scaling else None
+
+    best = results[0]
+    predictor = JobSuccessPredictor()
+    predictor.trained_through_id = trained_through_id
+    predictor.model.set_params(max_iter=1000, **best['params'])
+    predictor.pipeline.fit(X, y)
+    predictor.model.fit(predictor.scaler.fit_transform(predictor.pipeline.transform(X)), y)
+    predictor.save(
+        n_samples=len(y),
+        metrics={'accuracy': best['accuracy'], 'accuracy_std': best['accuracy_std'],
+                 'log_loss': best['log_loss'], 'cv_folds': folds},
+        params=best['params'],
+        activate=activate,
+    )
+    return predictor, results, elapsed, scaling_rows
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class ShadowStats:
+    """How a shadow version's scores compare with the active version's in this process.
+
+    Counters are updated without a lock so the prediction path never waits;
+    under heavy concurrency a few updates may be lost, which is fine for a
+    running comparison.
+    """
+
+    def __init__(self, version=None, active_version=None):
+        self.version = version
+        self.active_version = active_version
+        self.rows = 0
+        self.disagreements = 0
+        self.total_diff = 0.0
+        self.max_diff = 0.0
+        self.errors = 0
+
+    def record(self, active, shadow):
+        diff = np.abs(np.asarray(shadow) - np.asarray(active))
+        if len(diff) == 0:
+            return
+        self.rows += len(diff)
+        self.disagreements += int(np.count_nonzero((np.asarray(active) >= 0.5) != (np.asarray(shadow) >= 0.5)))
+        self.total_diff += float(diff.sum())
+        self.max_diff = max(self.max_diff, float(diff.max()))
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'active_version': self.active_version,
+            'rows': self.rows,
+            'mean_abs_diff': self.total_diff / self.rows if self.rows else None,
+            'max_abs_diff': self.max_diff if self.rows else None,
+            'disagreement_rate': self.disagreements / self.rows if self.rows else None,
+            'errors': self.errors,
+        }
+
+
+class ShadowScorer:
+    """Serves the active predictor's scores and scores the shadow version on the same rows.
+
+    Only the active scores are returned; the shadow scores are compared with
+    them in ``stats``. A failing shadow never affects the response.
+    """
+
+    def __init__(self, active, shadow, stats):
+        self.active = active
+        self.shadow = shadow
+        self.stats = stats
+
+    def __getattr__(self, name):
+        # version, trained_through_id, is_bootstrap, ... come from the active predictor
+        return getattr(self.active, name)
+
+    def _compare(self, active, score_shadow):
+        try:
+            self.stats.record(active, score_shadow())
+        except Exception as e:
+            self.stats.errors += 1
+            print(f"Shadow model error: {str(e)}")
+
+    def predict_row(self, values):
+        probability = self.active.predict_row(values)
+        self._compare([probability], lambda: [self.shadow.predict_row(values)])
+        return probability
+
+    def predict(self, survey_data):
+        probability = self.active.predict(survey_data)
+        self._compare([probability], lambda: [self.shadow.predict(survey_data)])
+        return probability
+
+    def predict_many(self, surveys):
+        probabilities = self.active.predict_many(surveys)
+        self._compare(probabilities, lambda: self.shadow.predict_many(surveys))
+        return probabilities
+
+    def predict_matrix(self, X):
+        probabilities = self.active.predict_matrix(X)
+        self._compare(probabilities, lambda: self.shadow.predict_matrix(X))
+        return probabilities
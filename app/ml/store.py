@@ -0,0 +1,233 @@
+import json
+import os
+import secrets
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+# Bumped whenever the layout of a version directory changes meaning
+MANIFEST_FORMAT = 1
+
+# Same default location as Flask's instance folder for this package
+DEFAULT_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'instance', 'models'
+)
+
+
+def write_file_atomically(path, data):
+    """Write bytes to a temporary file next to ``path``, fsync it and rename it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class ModelStore:
+    """Directory of immutable, versioned model artifacts.
+
+    Layout::
+
+        <root>/CURRENT                  name of the active version
+        <root>/HISTORY                  versions made active, oldest first, for rollback
+        <root>/SHADOW                   version scored alongside the active one, if any
+        <root>/versions/<version>/      manifest.json plus one .npy file per array
+        <root>/features/<version>/      cached feature matrix of the version's training rows
+
+    A version is written into a hidden temporary directory and renamed into
+    ``versions/`` once complete, and the pointer files are replaced
+    atomically, so a reader sees either the old or the new version and never
+    a partial one.
+    Arrays are plain .npy files that load memory-mapped: every worker shares
+    the same page-cache copy and loading takes constant time.
+    """
+
+    # Entries kept in HISTORY
+    HISTORY_SIZE = 50
+
+    def __init__(self, root=DEFAULT_ROOT, keep=5):
+        self.root = root
+        self.keep = keep
+
+    def init_app(self, app):
+        """Configure the location from MODEL_STORE_DIR and MODEL_STORE_KEEP"""
+        self.root = app.config.get('MODEL_STORE_DIR') or os.path.join(app.instance_path, 'models')
+        self.keep = app.config.get('MODEL_STORE_KEEP', 5)
+
+    @property
+    def versions_dir(self):
+        return os.path.join(self.root, 'versions')
+
+    @property
+    def current_path(self):
+        return os.path.join(self.root, 'CURRENT')
+
+    @property
+    def history_path(self):
+        return os.path.join(self.root, 'HISTORY')
+
+    @property
+    def shadow_path(self):
+        return os.path.join(self.root, 'SHADOW')
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def publish(self, arrays, manifest, activate=True):
+        """Write a new version, make it the current one unless ``activate`` is False, and return its name"""
+        version = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f') + '-' + secrets.token_hex(3)
+        os.makedirs(self.versions_dir, exist_ok=True)
+
+        tmp_dir = tempfile.mkdtemp(dir=self.versions_dir, prefix='.tmp-')
+        try:
+            files = {}
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array, dtype=np.float64)
+                with open(os.path.join(tmp_dir, f'{name}.npy'), 'wb') as f:
+                    np.save(f, array)
+                    f.flush()
+                    os.fsync(f.fileno())
+                files[name] = {'file': f'{name}.npy', 'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+            manifest = dict(manifest, format=MANIFEST_FORMAT, version=version,
+                            created_at=datetime.utcnow().isoformat(), arrays=files)
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp_dir, self.version_dir(version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.set_current(version)
+        self.prune(version)
+        return version
+
+    def _read_pointer(self, path):
+        try:
+            with open(path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _remove_pointer(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _check_version(self, version):
+        if version not in self.versions():
+            raise ValueError(f'Unknown model version {version}')
+
+    def set_current(self, version):
+        """Make ``version`` the active one and record it in the history"""
+        self._check_version(version)
+        history = self.history()
+        if not history or history[-1] != version:
+            history.append(version)
+        self._write_history(history)
+        write_file_atomically(self.current_path, version.encode())
+
+    def clear_current(self):
+        self._remove_pointer(self.current_path)
+
+    def current_version(self):
+        """Name of the active version, or None if nothing is published"""
+        return self._read_pointer(self.current_path)
+
+    def history(self):
+        """Versions that were made active, oldest first"""
+        history = self._read_pointer(self.history_path)
+        return history.split() if history else []
+
+    def _write_history(self, history):
+        # Older entries are of no use once their versions are pruned
+        history = history[-self.HISTORY_SIZE:]
+        write_file_atomically(self.history_path, ''.join(f'{version}\n' for version in history).encode())
+
+    def _rollback_history(self):
+        """History up to the most recent earlier version that still exists, which ends it"""
+        current = self.current_version()
+        history = self.history()
+        while history and (history[-1] == current or not os.path.isdir(self.version_dir(history[-1]))):
+            history.pop()
+        return history
+
+    def rollback_target(self):
+        """The version ``rollback`` would reactivate, or None"""
+        history = self._rollback_history()
+        return history[-1] if history else None
+
+    def rollback(self):
+        """Reactivate the most recent earlier version that still exists and return it"""
+        history = self._rollback_history()
+        if not history:
+            raise ValueError('No earlier model version to roll back to')
+        self._write_history(history)
+        write_file_atomically(self.current_path, history[-1].encode())
+        return history[-1]
+
+    def set_shadow(self, version):
+        """Score ``version`` alongside the active one without serving its results"""
+        self._check_version(version)
+        write_file_atomically(self.shadow_path, version.encode())
+
+    def clear_shadow(self):
+        self._remove_pointer(self.shadow_path)
+
+    def shadow_version(self):
+        return self._read_pointer(self.shadow_path)
+
+    def versions(self):
+        """Complete versions, oldest first (names sort by creation time)"""
+        try:
+            names = os.listdir(self.versions_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names if not name.startswith('.'))
+
+    def manifest(self, version):
+        with open(os.path.join(self.version_dir(version), 'manifest.json')) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != MANIFEST_FORMAT:
+            raise ValueError(f'Unsupported model manifest format {manifest.get("format")}')
+        return manifest
+
+    def load_arrays(self, version, mmap=True):
+        """The version's arrays by name, memory-mapped read-only unless ``mmap`` is False"""
+        manifest = self.manifest(version)
+        arrays = {}
+        for name, spec in manifest['arrays'].items():
+            path = os.path.join(self.version_dir(version), spec['file'])
+            arrays[name] = np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+        return manifest, arrays
+
+    def delete(self, version):
+        """Remove a version; the current or shadow version is unpublished first"""
+        if version == self.current_version():
+            self.clear_current()
+        if version == self.shadow_version():
+            self.clear_shadow()
+        shutil.rmtree(self.version_dir(version))
+        shutil.rmtree(os.path.join(self.root, 'features', version), ignore_errors=True)
+
+    def prune(self, *keep_versions):
+        """Delete the oldest versions beyond ``keep``, never the current, shadow, rollback target or given ones"""
+        pinned = {self.current_version(), self.shadow_version(), self.rollback_target(), *keep_versions}
+        old = [version for version in self.versions() if version not in pinned]
+        for version in old[:max(len(old) - max(self.keep - len(pinned - {None}), 0), 0)]:
+            shutil.rmtree(self.version_dir(version), ignore_errors=True)
+            shutil.rmtree(os.path.join(self.root, 'features', version), ignore_errors=True)
+
+
+model_store = ModelStore()
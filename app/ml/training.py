@@ -0,0 +1,121 @@
+import numpy as np
+from sklearn.metrics import accuracy_score, classification_report
+
+from app.models.survey import Survey
+from app.ml.dataset import (
+    DEFAULT_CHUNK_SIZE, iter_training_chunks, load_training_matrix, max_labelled_id
+)
+from app.ml.features import feature_cache
+from app.ml.model import JobSuccessPredictor
+
+# Every HOLDOUT_MODULUS-th survey (by id) is kept out of incremental training for evaluation
+HOLDOUT_MODULUS = 5
+
+
+def train_from_database(chunk_size=DEFAULT_CHUNK_SIZE, incremental=False, epochs=1, activate=True,
+                        backend='linear'):
+    """Train a predictor on the labelled surveys in the database.
+
+    By default the raw input columns are read in chunks into one
+    preallocated float32 matrix and the usual LogisticRegression is fitted
+    on it; the version's training feature matrix is then cached (see
+    app.ml.features.FeatureMatrixCache). With ``incremental`` the rows are
+    never held in memory at once: the feature pipeline and the scaler are
+    fitted in two passes, an SGD logistic regression is fitted chunk by
+    chunk in the following pass(es), and a final pass scores the held-out
+    rows. The model is published to the model store, as the
+    active version unless ``activate`` is False. Another ``backend`` (see
+    app.ml.backends) is fitted the same way as the default path. Returns
+    ``(predictor, n_samples, accuracy, report)``, where ``predictor`` is the
+    served scorer for other backends.
+
+    Surveys added while training runs are left for the online updater.
+    """
+    through_id = max_labelled_id()
+    seen_rows = Survey.id <= through_id
+
+    if backend != 'linear':
+        if incremental:
+            raise ValueError('Incremental training is only available for the linear model')
+        ids, X, y = load_training_matrix(seen_rows, chunk_size=chunk_size)
+        return train_backend(backend, X, y, trained_through_id=through_id, activate=activate, ids=ids)
+
+    if not incremental:
+        predictor = JobSuccessPredictor()
+        predictor.trained_through_id = through_id
+        ids, X, y = load_training_matrix(seen_rows, chunk_size=chunk_size)
+        accuracy, report = predictor.fit_matrix(X, y, activate=activate)
+        cache_features(predictor.version, predictor.pipeline, ids, X)
+        return predictor, len(y), accuracy, report
+
+    predictor = JobSuccessPredictor(incremental=True)
+    predictor.trained_through_id = through_id
+    train_rows = (seen_rows, Survey.id % HOLDOUT_MODULUS != 0)
+    test_rows = (seen_rows, Survey.id % HOLDOUT_MODULUS == 0)
+
+    n_samples = 0
+    for _, X, y in iter_training_chunks(*train_rows, chunk_size=chunk_size):
+        predictor.partial_fit_pipeline(X, y)
+        n_samples += len(X)
+    if n_samples == 0:
+        raise ValueError("No training data provided")
+    predictor.pipeline.finish_fit()
+
+    for _, X, _ in iter_training_chunks(*train_rows, chunk_size=chunk_size):
+        predictor.partial_fit_scaler(X)
+
+    for _ in range(epochs):
+        for _, X, y in iter_training_chunks(*train_rows, chunk_size=chunk_size):
+            predictor.partial_fit(X, y)
+
+    y_true, y_pred = [], []
+    for _, X, y in iter_training_chunks(*test_rows, chunk_size=chunk_size):
+        y_true.append(y)
+        y_pred.append(predictor.model.predict(predictor.scaler.transform(predictor.pipeline.transform(X))).astype(np.int8))
+    if y_true:
+        y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+        accuracy = accuracy_score(y_true, y_pred)
+        report = classification_report(y_true, y_pred)
+        metrics = {'accuracy': float(accuracy)}
+    else:
+        accuracy, report = float('nan'), 'No held-out surveys to evaluate on.'
+        metrics = {}
+
+    predictor.save(n_samples=n_samples, metrics=metrics, activate=activate)
+    return predictor, n_samples, accuracy, report
+
+
+def cache_features(version, pipeline, ids, X):
+    """Cache the raw and feature matrices of a version's training rows for later jobs such as rescoring"""
+    try:
+        feature_cache.save(version, ids, X, pipeline.transform(X))
+    except OSError as e:
+        print(f"Feature cache error: {str(e)}")
+
+
+def train_backend(name, X, y, trained_through_id=None, activate=True, test_size=0.2, ids=None):
+    """Fit a backend on a training split, evaluate it on the rest and publish it.
+
+    The feature matrix of all rows is cached for the version when their
+    survey ``ids`` are given. Returns ``(scorer, n_samples, accuracy, report)``
+    like train_from_database.
+    """
+    from sklearn.model_selection import train_test_split
+    from app.ml.backends import create_backend, evaluate
+
+    if len(y) == 0:
+        raise ValueError("No training data provided")
+    backend = create_backend(name)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    backend.fit(X_train, y_train)
+
+    metrics = evaluate(backend, X_test, y_test)
+    report = classification_report(y_test, backend.predict_proba(X_test) >= 0.5)
+    version = backend.save(n_samples=len(y), metrics=metrics,
+                           trained_through_id=trained_through_id, activate=activate)
+    if ids is not None:
+        cache_features(version, backend.pipeline, ids, X)
+
+    scorer = backend.scorer()
+    scorer.version, scorer.trained_through_id = version, trained_through_id
+    return scorer, len(y), metrics['accuracy'], report
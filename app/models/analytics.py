@@ -0,0 +1,190 @@
+from app import db
+from app.models.survey import Survey
+from sqlalchemy import event, case, func, inspect, select, cast
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Upper bounds (exclusive) of the years-of-experience buckets; the last bucket is open-ended
+EXPERIENCE_BUCKETS = [(1, '0-1'), (3, '1-3'), (5, '3-5'), (10, '5-10'), (None, '10+')]
+
+# Rollup dimensions: a grand total plus one per grouped survey attribute
+DIMENSIONS = ['overall', 'industry_type', 'education_level', 'experience']
+
+
+class SurveyStat(db.Model):
+    """Running survey counts per dimension bucket, kept in step with the survey table"""
+    __tablename__ = 'survey_stat'
+
+    dimension = db.Column(db.String(32), primary_key=True)
+    bucket = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    labelled = db.Column(db.Integer, nullable=False, default=0)
+    successes = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def success_rate(self):
+        return self.successes / self.labelled if self.labelled else None
+
+    def to_dict(self):
+        return {
+            'bucket': self.bucket,
+            'total': self.total,
+            'labelled': self.labelled,
+            'successes': self.successes,
+            'success_rate': self.success_rate,
+        }
+
+    def __repr__(self):
+        return f'<SurveyStat {self.dimension}={self.bucket}>'
+
+
+def experience_bucket(years):
+    for upper, label in EXPERIENCE_BUCKETS:
+        if upper is None or years < upper:
+            return label
+
+
+def survey_buckets(industry_type, education_level, years_experience):
+    """(dimension, bucket) pairs a survey with these values is counted under"""
+    return [
+        ('overall', 'all'),
+        ('industry_type', industry_type),
+        ('education_level', str(education_level)),
+        ('experience', experience_bucket(years_experience)),
+    ]
+
+
+def apply_delta(connection, buckets, total, labelled, successes):
+    """Add the given counts to each (dimension, bucket) row, creating rows as needed"""
+    dialect = connection.dialect.name
+    for dimension, bucket in buckets:
+        values = dict(dimension=dimension, bucket=bucket,
+                      total=total, labelled=labelled, successes=successes)
+        table = SurveyStat.__table__
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = insert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['dimension', 'bucket'],
+                set_={
+                    'total': table.c.total + stmt.excluded.total,
+                    'labelled': table.c.labelled + stmt.excluded.labelled,
+                    'successes': table.c.successes + stmt.excluded.successes,
+                }
+            )
+            connection.execute(stmt)
+        else:
+            result = connection.execute(
+                table.update()
+                .where(table.c.dimension == dimension, table.c.bucket == bucket)
+                .values(total=table.c.total + total,
+                        labelled=table.c.labelled + labelled,
+                        successes=table.c.successes + successes)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**values))
+
+
+def survey_counts(success, sign=1):
+    """(total, labelled, successes) contribution of one survey"""
+    return sign, sign * (success is not None), sign * bool(success)
+
+
+@event.listens_for(Survey, 'after_insert')
+def survey_inserted(mapper, connection, target):
+    buckets = survey_buckets(target.industry_type, target.education_level, target.years_experience)
+    apply_delta(connection, buckets, *survey_counts(target.success))
+
+
+@event.listens_for(Survey, 'after_delete')
+def survey_deleted(mapper, connection, target):
+    buckets = survey_buckets(target.industry_type, target.education_level, target.years_experience)
+    apply_delta(connection, buckets, *survey_counts(target.success, -1))
+
+
+@event.listens_for(Survey, 'after_update')
+def survey_updated(mapper, connection, target):
+    state = inspect(target)
+    tracked = ['industry_type', 'education_level', 'years_experience', 'success']
+    if not any(state.attrs[name].history.has_changes() for name in tracked):
+        return
+
+    def old_value(name):
+        history = state.attrs[name].history
+        return history.deleted[0] if history.deleted else getattr(target, name)
+
+    old = [old_value(name) for name in tracked]
+    apply_delta(connection, survey_buckets(*old[:3]), *survey_counts(old[3], -1))
+    apply_delta(connection, survey_buckets(target.industry_type, target.education_level,
+                                           target.years_experience),
+                *survey_counts(target.success))
+
+
+def experience_bucket_sql(column):
+    """SQL expression matching experience_bucket()"""
+    whens = [(column < upper, label) for upper, label in EXPERIENCE_BUCKETS if upper is not None]
+    return case(*whens, else_=EXPERIENCE_BUCKETS[-1][1])
+
+
+def dimension_expressions():
+    """Bucket expression per dimension; the overall row has none and is one plain aggregate"""
+    return {
+        'overall': None,
+        'industry_type': Survey.industry_type,
+        'education_level': cast(Survey.education_level, db.String),
+        'experience': experience_bucket_sql(Survey.years_experience),
+    }
+
+
+def grouped_counts(*filters):
+    """Yield (dimension, bucket, total, labelled, successes) for surveys matching filters"""
+    counts = [
+        func.count(Survey.id),
+        func.count(Survey.success),
+        func.coalesce(func.sum(case((Survey.success == True, 1), else_=0)), 0)
+    ]
+    for dimension, expression in dimension_expressions().items():
+        if expression is None:
+            # GROUP BY a constant is rejected by PostgreSQL
+            total, labelled, successes = db.session.execute(select(*counts).where(*filters)).one()
+            if total:
+                yield dimension, 'all', total, labelled, successes
+            continue
+        rows = db.session.execute(select(expression, *counts).where(*filters).group_by(expression))
+        for bucket, total, labelled, successes in rows:
+            yield dimension, bucket, total, labelled, successes
+
+
+def rebuild_survey_stats():
+    """Recompute every rollup row from the survey table"""
+    rows = [
+        dict(dimension=dimension, bucket=bucket, total=total, labelled=labelled, successes=successes)
+        for dimension, bucket, total, labelled, successes in grouped_counts()
+    ]
+    db.session.execute(SurveyStat.__table__.delete())
+    if rows:
+        db.session.execute(SurveyStat.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def delete_surveys(*filters):
+    """Bulk-delete surveys while keeping the rollups in step.
+
+    Query.delete() bypasses the ORM delete events, so the deleted rows'
+    contribution is subtracted with one grouped query per dimension first.
+    The caller commits.
+    """
+    connection = db.session.connection()
+    for dimension, bucket, total, labelled, successes in list(grouped_counts(*filters)):
+        apply_delta(connection, [(dimension, bucket)], -total, -labelled, -successes)
+    return Survey.query.filter(*filters).delete(synchronize_session=False)
+
+
+def success_rates():
+    """Rollup rows grouped by dimension, ready to be serialized"""
+    stats = SurveyStat.query.filter(SurveyStat.total > 0) \
+        .order_by(SurveyStat.dimension, SurveyStat.bucket).all()
+    result = {dimension: [] for dimension in DIMENSIONS}
+    for stat in stats:
+        result.setdefault(stat.dimension, []).append(stat.to_dict())
+    return result
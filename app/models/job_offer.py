@@ -2,8 +2,15 @@ from app import db
 from datetime import datetime
 
 class JobOffer(db.Model):
+    __table_args__ = (
+        # Serves the active-offers listing ordered by newest first
+        db.Index('ix_job_offer_is_active_created_at', 'is_active', 'created_at'),
+        # Pre-filters offers for the matching engine
+        db.Index('ix_job_offer_is_active_industry_type_education_level', 'is_active', 'industry_type', 'education_level'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    employer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    employer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
     requirements = db.Column(db.Text, nullable=False)
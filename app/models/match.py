@@ -0,0 +1,46 @@
+from app import db
+from datetime import datetime
+
+
+class JobMatch(db.Model):
+    """A scored (survey, job offer) pair in one side's top-K list.
+
+    ``side`` 'survey' rows are the best offers for the survey's author;
+    ``side`` 'offer' rows are the best candidates for the offer. A pair in
+    both lists is stored once per side. Maintained by app.ml.matching.
+    """
+    __tablename__ = 'job_match'
+    __table_args__ = (
+        # Serve each side's list best first
+        db.Index('ix_job_match_side_survey_id_score', 'side', 'survey_id', 'score'),
+        db.Index('ix_job_match_side_job_offer_id_score', 'side', 'job_offer_id', 'score'),
+    )
+
+    side = db.Column(db.String(8), primary_key=True)
+    survey_id = db.Column(db.Integer, db.ForeignKey('survey.id', ondelete='CASCADE'), primary_key=True)
+    job_offer_id = db.Column(db.Integer, db.ForeignKey('job_offer.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    model_version = db.Column(db.String(32))
+
+    def __repr__(self):
+        return f'<JobMatch {self.side} survey={self.survey_id} offer={self.job_offer_id} {self.score:.3f}>'
+
+
+class MatchChange(db.Model):
+    """A queued update of the job_match lists, applied off the request path.
+
+    ``kind`` is 'survey' or 'offer' to refresh that row's matches after it
+    was added, changed or deleted, 'survey_list' or 'offer_list' to rank
+    that row's list again, and 'rebuild' (no ``row_id``) to recompute every
+    list. ``row_id`` has no foreign key because the row may
+    already be deleted. Applied oldest first by app.ml.matching.
+    """
+    __tablename__ = 'match_change'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(16), nullable=False)
+    row_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<MatchChange {self.kind} {self.row_id}>'
@@ -2,10 +2,19 @@ from app import db
 from datetime import datetime
 
 class Survey(db.Model):
+    __table_args__ = (
+        # Serves a user's surveys and their latest one (profile, dashboard, deletes)
+        db.Index('ix_survey_user_id_created_at', 'user_id', 'created_at'),
+        # Serves an employer's candidates above a score threshold, best first
+        db.Index('ix_survey_job_offer_id_success_probability', 'job_offer_id', 'success_probability'),
+        # Pre-filters candidates for the matching engine (and the admin industry filter)
+        db.Index('ix_survey_industry_type_education_level', 'industry_type', 'education_level'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    is_public = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    is_public = db.Column(db.Boolean, default=False, index=True)
     success = db.Column(db.Boolean)  # Target variable (successful application or not)
     job_offer_id = db.Column(db.Integer, db.ForeignKey('job_offer.id'), nullable=True)
     
@@ -18,6 +27,19 @@ class Survey(db.Model):
     certifications = db.Column(db.Integer, nullable=False)
     language_proficiency = db.Column(db.Float, nullable=False)  # Scale of 0-1
     interview_prep_score = db.Column(db.Float, nullable=False)  # Scale of 0-1
+
+    # Stored prediction, refreshed whenever a new model is trained
+    success_probability = db.Column(db.Float, index=True)  # Scale of 0-1
+    model_version = db.Column(db.String(32))
+
+    job_offer = db.relationship('JobOffer', backref=db.backref('applications', lazy='dynamic'))
+
+    @property
+    def probability_percent(self):
+        """Stored success probability as a percentage, or None if not scored yet"""
+        if self.success_probability is None:
+            return None
+        return self.success_probability * 100
     
     def to_feature_vector(self):
         """Convert survey data to feature vector for ML model"""
@@ -8,8 +8,8 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(64), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(128))
-    role = db.Column(db.String(20), nullable=False, default='worker')  # 'worker' or 'employer'
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    role = db.Column(db.String(20), nullable=False, default='worker', index=True)  # 'worker' or 'employer'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     surveys = db.relationship('Survey', backref='author', lazy='dynamic')
     is_admin = db.Column(db.Boolean, default=False)
 
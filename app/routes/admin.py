@@ -1,10 +1,18 @@
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, request
 from flask_login import login_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
 from app import db
 from app.models.user import User
 from app.models.survey import Survey
+from app.models.analytics import SurveyStat, delete_surveys
+from app.ml.store import model_store
+from app.ml.registry import registry
+from app.ml.rescore import launch_rescore
+from app.ml.cache import prediction_cache
+from app.ml.matching import notify_model_changed, notify_survey_changed, notify_surveys_removed
 from functools import wraps
-import os
 from flask import current_app
 
 bp = Blueprint('admin', __name__)
@@ -18,16 +26,108 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Columns the admin tables may be sorted by, keyed by the ?sort= value
+USER_SORTS = {
+    'username': User.username,
+    'email': User.email,
+    'role': User.role,
+    'created_at': User.created_at,
+}
+SURVEY_SORTS = {
+    'created_at': Survey.created_at,
+    'industry': Survey.industry_type,
+    'success': Survey.success,
+}
+
+def order_by_arg(sorts, sort, direction, default, id_column):
+    """ORDER BY clauses for a whitelisted sort key, with the id as a tie-breaker"""
+    column = sorts.get(sort, sorts[default])
+    if direction == 'desc':
+        return column.desc(), id_column.desc()
+    return column.asc(), id_column.asc()
+
+def dashboard_summary(days=30):
+    """Aggregate counts for the admin summary panel, computed in SQL"""
+    users_by_role = db.session.query(User.role, func.count(User.id)) \
+        .group_by(User.role).order_by(User.role).all()
+
+    # Read from the maintained rollups instead of grouping the survey table
+    success_by_industry = [
+        (stat.bucket, stat.labelled, stat.success_rate)
+        for stat in SurveyStat.query.filter(
+            SurveyStat.dimension == 'industry_type', SurveyStat.labelled > 0
+        ).order_by(SurveyStat.bucket)
+    ]
+
+    day = func.date(Survey.created_at)
+    since = datetime.utcnow() - timedelta(days=days)
+    surveys_per_day = db.session.query(day, func.count(Survey.id)) \
+        .filter(Survey.created_at >= since) \
+        .group_by(day).order_by(day.desc()).all()
+
+    return {
+        'users_by_role': users_by_role,
+        'success_by_industry': success_by_industry,
+        'surveys_per_day': surveys_per_day,
+        'days': days,
+    }
+
+def model_versions():
+    """Manifests of the stored model versions, newest first, flagged active/shadow"""
+    current, shadow = model_store.current_version(), model_store.shadow_version()
+    versions = []
+    for version in reversed(model_store.versions()):
+        try:
+            manifest = model_store.manifest(version)
+        except (OSError, ValueError) as e:
+            print(f"Model manifest error: {str(e)}")
+            continue
+        manifest['active'] = version == current
+        manifest['shadow'] = version == shadow
+        versions.append(manifest)
+    return versions
+
+def model_changed():
+    """Swap the model in this worker now and refresh the stored scores and matches in the background"""
+    registry.invalidate()
+    notify_model_changed()
+    if current_app.config.get('RESCORE_ON_MODEL_CHANGE', True):
+        try:
+            launch_rescore()
+        except OSError as e:
+            flash(f'Could not start rescoring: {e}', 'error')
+
 @bp.route('/dashboard')
 @login_required
 @admin_required
 def admin_dashboard():
-    users = User.query.all()
-    surveys = Survey.query.all()
+    per_page = current_app.config.get('ADMIN_PER_PAGE', 25)
+    args = request.args
+
+    user_query = User.query
+    if args.get('role'):
+        user_query = user_query.filter(User.role == args['role'])
+    if args.get('q'):
+        user_query = user_query.filter(User.username.startswith(args['q'], autoescape=True))
+    users = user_query.order_by(*order_by_arg(
+        USER_SORTS, args.get('users_sort'), args.get('users_dir'), 'username', User.id
+    )).paginate(page=args.get('users_page', 1, type=int), per_page=per_page, error_out=False)
+
+    survey_query = Survey.query.options(joinedload(Survey.author))
+    if args.get('industry'):
+        survey_query = survey_query.filter(Survey.industry_type == args['industry'])
+    if args.get('success') in ('yes', 'no'):
+        survey_query = survey_query.filter(Survey.success == (args['success'] == 'yes'))
+    surveys = survey_query.order_by(*order_by_arg(
+        SURVEY_SORTS, args.get('surveys_sort'), args.get('surveys_dir', 'desc'), 'created_at', Survey.id
+    )).paginate(page=args.get('surveys_page', 1, type=int), per_page=per_page, error_out=False)
+
     return render_template('admin/dashboard.html',
                          title='Admin Dashboard',
                          users=users,
-                         surveys=surveys)
+                         surveys=surveys,
+                         summary=dashboard_summary(),
+                         model_versions=model_versions())
 
 @bp.route('/user/<int:id>/delete')
 @login_required
@@ -39,9 +139,11 @@ def delete_user(id):
         return redirect(url_for('admin.admin_dashboard'))
     
     # Delete user's surveys first
-    Survey.query.filter_by(user_id=user.id).delete()
+    survey_ids = [survey_id for (survey_id,) in db.session.query(Survey.id).filter_by(user_id=user.id)]
+    delete_surveys(Survey.user_id == user.id)
     db.session.delete(user)
     db.session.commit()
+    notify_surveys_removed(survey_ids)
     flash(f'User {user.username} has been deleted.')
     return redirect(url_for('admin.admin_dashboard'))
 
@@ -66,6 +168,11 @@ def delete_survey(id):
     survey = Survey.query.get_or_404(id)
     db.session.delete(survey)
     db.session.commit()
+    notify_surveys_removed([id])
+    # The user's previous survey, if any, is their profile again
+    previous = db.session.query(func.max(Survey.id)).filter_by(user_id=survey.user_id).scalar()
+    if previous:
+        notify_survey_changed(previous)
     flash('Survey has been deleted.')
     return redirect(url_for('admin.admin_dashboard'))
 
@@ -73,34 +180,91 @@ def delete_survey(id):
 @login_required
 @admin_required
 def delete_model():
-    """Delete the trained ML model and scaler files"""
-    model_path = os.path.join(current_app.root_path, 'ml', 'job_success_model.pkl')
-    scaler_path = os.path.join(current_app.root_path, 'ml', 'scaler.pkl')
+    """Delete the published model version from the model store"""
+    version = model_store.current_version()
+    if version is None:
+        flash('No trained model to delete.', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
 
-    deleted_files = []
-    errors = []
+    try:
+        model_store.delete(version)
+    except OSError as e:
+        flash(f'Error deleting model version {version}: {e}', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
 
-    if os.path.exists(model_path):
-        try:
-            os.remove(model_path)
-            deleted_files.append('job_success_model.pkl')
-        except OSError as e:
-            errors.append(f'Error deleting job_success_model.pkl: {e}')
-    else:
-        errors.append('job_success_model.pkl not found.')
+    flash(f'Successfully deleted model version {version}.', 'success')
+    # Stored scores came from the deleted model
+    model_changed()
+    return redirect(url_for('admin.admin_dashboard'))
 
-    if os.path.exists(scaler_path):
-        try:
-            os.remove(scaler_path)
-            deleted_files.append('scaler.pkl')
-        except OSError as e:
-            errors.append(f'Error deleting scaler.pkl: {e}')
-    else:
-        errors.append('scaler.pkl not found.')
-
-    if deleted_files:
-        flash(f'Successfully deleted: {", ".join(deleted_files)}.', 'success')
-    if errors:
-        flash(f'Errors occurred: {", ".join(errors)}', 'error')
-    
-    return redirect(url_for('admin.admin_dashboard')) 
\ No newline at end of file
+@bp.route('/model/<version>/promote', methods=['POST'])
+@login_required
+@admin_required
+def promote_model(version):
+    """Make a stored model version the active one"""
+    try:
+        model_store.set_current(version)
+    except (OSError, ValueError) as e:
+        flash(f'Could not promote model version {version}: {e}', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
+
+    flash(f'Model version {version} is now active.', 'success')
+    model_changed()
+    return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/model/rollback', methods=['POST'])
+@login_required
+@admin_required
+def rollback_model():
+    """Reactivate the previously active model version"""
+    try:
+        version = model_store.rollback()
+    except (OSError, ValueError) as e:
+        flash(f'Could not roll back: {e}', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
+
+    flash(f'Rolled back to model version {version}.', 'success')
+    model_changed()
+    return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/model/<version>/shadow', methods=['POST'])
+@login_required
+@admin_required
+def shadow_model(version):
+    """Score a stored model version alongside the active one without serving it"""
+    try:
+        model_store.set_shadow(version)
+    except (OSError, ValueError) as e:
+        flash(f'Could not shadow model version {version}: {e}', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
+
+    registry.invalidate()
+    flash(f'Shadowing model version {version}.', 'success')
+    return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/model/shadow/stop', methods=['POST'])
+@login_required
+@admin_required
+def stop_shadow_model():
+    """Stop scoring the shadow model version"""
+    model_store.clear_shadow()
+    registry.invalidate()
+    flash('Shadow scoring stopped.', 'success')
+    return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/model/shadow')
+@login_required
+@admin_required
+def shadow_model_stats():
+    """How the shadow version's scores compare with the active version's in this worker process"""
+    registry.get_predictor()
+    if registry.shadow_stats is None:
+        return jsonify({'version': model_store.shadow_version(), 'rows': 0})
+    return jsonify(registry.shadow_stats.to_dict())
+
+@bp.route('/prediction-cache')
+@login_required
+@admin_required
+def prediction_cache_stats():
+    """Hit/miss counters of the prediction cache in this worker process"""
+    return jsonify(prediction_cache.stats())
@@ -0,0 +1,166 @@
+import json
+
+import numpy as np
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from app import csrf
+from app.models.analytics import success_rates
+from app.ml.cache import prediction_cache
+from app.ml.model import FEATURE_BOUNDS, FEATURE_COLUMNS, RAW_COLUMNS, industry_code, raw_matrix
+from app.models.job_offer import JobOffer
+from app.ml.registry import get_predictor
+
+try:
+    import orjson
+except ImportError:  # optional, speeds up large JSON bodies
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for application/msgpack bodies
+    msgpack = None
+
+bp = Blueprint('api', __name__)
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+LOWER_BOUNDS = np.array([FEATURE_BOUNDS[column][0] for column in FEATURE_COLUMNS], dtype=float)
+UPPER_BOUNDS = np.array([FEATURE_BOUNDS[column][1] for column in FEATURE_COLUMNS], dtype=float)
+
+
+class BatchError(Exception):
+    """Invalid batch request, reported to the client with the given status code"""
+
+    def __init__(self, message, status=400, rows=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.rows = rows
+
+
+def api_response(payload, status=200):
+    """Serialize a JSON response, using orjson when it is installed"""
+    if orjson is not None:
+        return Response(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+                        status=status, mimetype='application/json')
+    return jsonify(payload), status
+
+
+def decode_body():
+    """Decode the request body as JSON or MessagePack"""
+    max_bytes = current_app.config.get('PREDICT_BATCH_MAX_BYTES', 1024 * 1024)
+    if request.content_length is not None and request.content_length > max_bytes:
+        raise BatchError(f'Request body larger than {max_bytes} bytes', 413)
+    # A chunked body has no Content-Length; read at most one byte past the
+    # limit so an oversized one is refused without being buffered
+    chunks, size = [], 0
+    while size <= max_bytes:
+        chunk = request.stream.read(max_bytes + 1 - size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    if size > max_bytes:
+        raise BatchError(f'Request body larger than {max_bytes} bytes', 413)
+    data = b''.join(chunks)
+
+    try:
+        if request.mimetype in MSGPACK_TYPES:
+            if msgpack is None:
+                raise BatchError('MessagePack bodies are not supported on this server', 415)
+            return msgpack.unpackb(data, raw=False)
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    except BatchError:
+        raise
+    except Exception:
+        raise BatchError('Request body could not be decoded')
+
+
+def profiles_to_matrix(profiles):
+    """Validate a list of feature dicts and return them as a raw (n, len(RAW_COLUMNS)) input matrix.
+
+    Besides the seven features a profile may name its ``industry_type`` and
+    the ``job_offer_id`` it applies to; the offers are read in one query.
+    """
+    if not isinstance(profiles, list) or not profiles:
+        raise BatchError('Expected a non-empty list of profiles')
+    max_rows = current_app.config.get('PREDICT_BATCH_MAX_ROWS', 1000)
+    if len(profiles) > max_rows:
+        raise BatchError(f'At most {max_rows} profiles per request', 413)
+    if not all(isinstance(profile, dict) for profile in profiles):
+        raise BatchError('Every profile must be an object')
+
+    try:
+        X = np.array(
+            [[profile.get(column, np.nan) for column in FEATURE_COLUMNS] for profile in profiles],
+            dtype=float
+        )
+    except (TypeError, ValueError):
+        raise BatchError('Feature values must be numbers')
+
+    # Check missing values and ranges for the whole batch at once
+    invalid = ~np.isfinite(X) | (X < LOWER_BOUNDS) | (X > UPPER_BOUNDS)
+    bad_rows = np.flatnonzero(invalid.any(axis=1))
+    if bad_rows.size:
+        raise BatchError('Missing or out-of-range features', rows=bad_rows[:100].tolist())
+
+    industries = [profile.get('industry_type') for profile in profiles]
+    if not all(industry is None or isinstance(industry, str) for industry in industries):
+        raise BatchError('industry_type must be a string')
+    R = raw_matrix(X, industries)
+
+    offer_ids = [profile.get('job_offer_id') for profile in profiles]
+    if any(offer_id is not None for offer_id in offer_ids):
+        if not all(offer_id is None or (isinstance(offer_id, int) and not isinstance(offer_id, bool))
+                   for offer_id in offer_ids):
+            raise BatchError('job_offer_id must be an integer')
+        offers = {offer.id: offer for offer in
+                  JobOffer.query.filter(JobOffer.id.in_({i for i in offer_ids if i is not None}))}
+        unknown = [row for row, offer_id in enumerate(offer_ids) if offer_id is not None and offer_id not in offers]
+        if unknown:
+            raise BatchError('Unknown job_offer_id', rows=unknown[:100])
+        offer_columns = [RAW_COLUMNS.index(column) for column in
+                         ('offer_required_experience', 'offer_education_level', 'offer_industry')]
+        for row, offer_id in enumerate(offer_ids):
+            if offer_id is not None:
+                offer = offers[offer_id]
+                R[row, offer_columns] = [offer.required_experience, offer.education_level,
+                                         industry_code(offer.industry_type)]
+    return R
+
+
+@bp.route('/predict/batch', methods=['POST'])
+@csrf.exempt
+def predict_batch():
+    """Score many feature dicts with a single model call"""
+    try:
+        body = decode_body()
+        profiles = body.get('profiles') if isinstance(body, dict) else body
+        X = profiles_to_matrix(profiles)
+    except BatchError as e:
+        payload = {'success': False, 'error': e.message}
+        if e.rows is not None:
+            payload['invalid_rows'] = e.rows
+        return api_response(payload, e.status)
+
+    try:
+        predictor = get_predictor()
+        probabilities = prediction_cache.predict_matrix(predictor, X)
+    except Exception as e:
+        print(f"Prediction error: {str(e)}")
+        return api_response({'success': False, 'error': str(e)}, 500)
+
+    return api_response({
+        'success': True,
+        'model_version': predictor.version,
+        'count': len(probabilities),
+        'probabilities': np.round(probabilities, 4).tolist()
+    })
+
+
+@bp.route('/analytics/success-rates', methods=['GET'])
+def analytics_success_rates():
+    """Success-rate breakdowns by industry, education and experience, read from the rollups"""
+    return api_response({'success': True, 'dimensions': success_rates()})
@@ -4,8 +4,12 @@ from app import db
 from app.models.user import User
 from app.models.survey import Survey
 from app.models.job_offer import JobOffer
+from app.models.analytics import delete_surveys
 from app.forms.auth import LoginForm, RegistrationForm, ProfileUpdateForm
-from app.ml.model import JobSuccessPredictor
+from app.ml.registry import get_predictor
+from app.ml.scoring import ensure_scores
+from app.ml.matching import notify_offers_removed, notify_surveys_removed
+from app.job_search import job_search
 from urllib.parse import urlparse
 
 bp = Blueprint('auth', __name__)
@@ -106,11 +110,12 @@ def profile():
         # Get user's latest survey
         latest_survey = Survey.query.filter_by(user_id=current_user.id).order_by(Survey.created_at.desc()).first()
         if latest_survey:
-            predictor = JobSuccessPredictor()
+            predictor = get_predictor()
             try:
-                success_probability = predictor.predict(latest_survey)
+                ensure_scores([latest_survey], predictor)
+                success_probability = latest_survey.success_probability
                 feature_importance = predictor.get_feature_importance()
-                prediction_available = True
+                prediction_available = success_probability is not None
             except Exception as e:
                 print(f"Prediction error: {str(e)}")
 
@@ -126,15 +131,21 @@ def profile():
 def delete_profile():
     try:
         # Delete user's surveys
-        Survey.query.filter_by(user_id=current_user.id).delete()
+        survey_ids = [survey_id for (survey_id,) in db.session.query(Survey.id).filter_by(user_id=current_user.id)]
+        delete_surveys(Survey.user_id == current_user.id)
         
         # Delete user's job offers if they're an employer
+        offer_ids = []
         if current_user.is_employer():
+            offer_ids = [offer_id for (offer_id,) in db.session.query(JobOffer.id).filter_by(employer_id=current_user.id)]
             JobOffer.query.filter_by(employer_id=current_user.id).delete()
+            job_search.remove_offers(offer_ids)
         
         # Delete the user
         db.session.delete(current_user)
         db.session.commit()
+        notify_surveys_removed(survey_ids)
+        notify_offers_removed(offer_ids)
         flash('Вашият профил беше изтрит успешно.')
         return redirect(url_for('main.index'))
     except Exception as e:
@@ -1,21 +1,80 @@
-from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify
+from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db, mail
 from app.models.job_offer import JobOffer
 from app.models.survey import Survey
-from app.forms.job_offer import JobOfferForm
+from app.forms.job_offer import JobOfferForm, JobSearchForm
 from app.forms.job_application import JobApplicationForm
-from app.ml.model import JobSuccessPredictor
-import numpy as np
+from app.ml.registry import get_predictor
+from app.ml.cache import prediction_cache
+from app.ml.scoring import score_surveys
+from app.ml.matching import matching_engine, notify_offer_changed, notify_offers_removed, notify_survey_changed
+from app.job_search import job_search
 from flask_mail import Message
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+from datetime import datetime
 
 bp = Blueprint('job_offers', __name__)
 
+def encode_cursor(job_offer):
+    """Cursor pointing just after the given offer in newest-first order"""
+    return f'{job_offer.created_at.isoformat()}_{job_offer.id}'
+
+def decode_cursor(cursor):
+    """Parse a cursor into (created_at, id), or None if it is missing or malformed"""
+    try:
+        created_at, offer_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(offer_id)
+    except (AttributeError, ValueError):
+        return None
+
 @bp.route('/job-offers', methods=['GET'])
 def list_jobs():
-    """List all active job offers"""
-    job_offers = JobOffer.query.filter_by(is_active=True).order_by(JobOffer.created_at.desc()).all()
-    return render_template('job_offers/list.html', job_offers=job_offers)
+    """List active job offers, newest first, one page at a time"""
+    per_page = current_app.config.get('JOB_OFFERS_PER_PAGE', 20)
+    query = JobOffer.query.options(joinedload(JobOffer.employer)).filter_by(is_active=True)
+
+    # Keyset pagination: continue after the last offer of the previous page
+    cursor = decode_cursor(request.args.get('after'))
+    if cursor:
+        created_at, offer_id = cursor
+        query = query.filter(or_(
+            JobOffer.created_at < created_at,
+            and_(JobOffer.created_at == created_at, JobOffer.id < offer_id)
+        ))
+
+    job_offers = query.order_by(JobOffer.created_at.desc(), JobOffer.id.desc()).limit(per_page + 1).all()
+    next_cursor = encode_cursor(job_offers[per_page - 1]) if len(job_offers) > per_page else None
+    return render_template('job_offers/list.html',
+                         job_offers=job_offers[:per_page],
+                         next_cursor=next_cursor,
+                         is_first_page=cursor is None,
+                         search_form=JobSearchForm(formdata=None))
+
+@bp.route('/job-offers/search', methods=['GET'])
+def search_jobs():
+    """Search active job offers by keywords, best matches first"""
+    per_page = current_app.config.get('JOB_OFFERS_PER_PAGE', 20)
+    page = max(request.args.get('page', 1, type=int), 1)
+    form = JobSearchForm(formdata=request.args)
+    job_offers = []
+    if form.validate():
+        # Ranked results have no stable cursor, so pages are offsets
+        job_offers = job_search.search(
+            form.q.data,
+            industry=form.industry.data or None,
+            location=form.location.data,
+            limit=per_page + 1,
+            offset=(page - 1) * per_page
+        )
+    search_args = {name: value for name, value in request.args.items() if name not in ('page', 'submit')}
+    return render_template('job_offers/list.html',
+                         job_offers=job_offers[:per_page],
+                         search_form=form,
+                         search_args=search_args,
+                         page=page,
+                         has_more=len(job_offers) > per_page)
 
 @bp.route('/job-offers/new', methods=['GET', 'POST'])
 @login_required
@@ -39,7 +98,9 @@ def create_job_offer():
             education_level=form.education_level.data
         )
         db.session.add(job_offer)
+        job_search.index_offer(job_offer)
         db.session.commit()
+        notify_offer_changed(job_offer.id)
         flash('Обявата е публикувана успешно!', 'success')
         return redirect(url_for('job_offers.list_jobs'))
     
@@ -49,7 +110,11 @@ def create_job_offer():
 def view_job_offer(id):
     """View a specific job offer"""
     job_offer = JobOffer.query.get_or_404(id)
-    return render_template('job_offers/view.html', job_offer=job_offer)
+    # The owner sees the best-matching candidates among all profiles
+    best_candidates = []
+    if current_user.is_authenticated and job_offer.employer_id == current_user.id:
+        best_candidates = matching_engine.candidates_for_offer(id)
+    return render_template('job_offers/view.html', job_offer=job_offer, best_candidates=best_candidates)
 
 @bp.route('/job-offers/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -64,7 +129,14 @@ def edit_job_offer(id):
     form = JobOfferForm(obj=job_offer)
     if form.validate_on_submit():
         form.populate_obj(job_offer)
+        # The offer's requirements are model inputs, so its applications are re-scored
+        try:
+            score_surveys(job_offer.applications.all())
+        except Exception as e:
+            print(f"Prediction error: {str(e)}")
+        job_search.index_offer(job_offer)
         db.session.commit()
+        notify_offer_changed(job_offer.id)
         flash('Обявата е обновена успешно!', 'success')
         return redirect(url_for('job_offers.view_job_offer', id=id))
     
@@ -82,6 +154,7 @@ def toggle_job_offer(id):
     
     job_offer.is_active = not job_offer.is_active
     db.session.commit()
+    notify_offer_changed(job_offer.id)
     status = 'активирана' if job_offer.is_active else 'деактивирана'
     flash(f'Обявата е {status} успешно!', 'success')
     return redirect(url_for('job_offers.view_job_offer', id=id))
@@ -97,7 +170,10 @@ def delete_job_offer(id):
         return redirect(url_for('job_offers.view_job_offer', id=id))
     
     db.session.delete(job_offer)
+    job_search.remove_offers([id])
     db.session.commit()
+    # Drops the offer from the candidates' recommendations
+    notify_offers_removed([id])
     flash('Обявата е изтрита успешно!', 'success')
     return redirect(url_for('job_offers.list_jobs'))
 
@@ -131,36 +207,22 @@ def apply_job(id):
             certifications=form.certifications.data,
             language_proficiency=int(form.language_proficiency.data) / 5.0,  # Normalize to 0-1
             interview_prep_score=form.interview_prep_score.data / 10.0,  # Normalize to 0-1
-            job_offer_id=job_offer.id
+            job_offer=job_offer
         )
 
         # Get prediction
-        predictor = JobSuccessPredictor()
+        predictor = get_predictor()
         try:
-            # Initialize model with some default data if not trained
-            if not predictor.is_trained:
-                # Create synthetic training data
-                X = np.array([
-                    [5, 3, 5, 2, 2, 0.6, 0.8],  # Successful candidate
-                    [1, 1, 2, 0, 0, 0.2, 0.3],  # Unsuccessful candidate
-                    [3, 2, 4, 1, 1, 0.4, 0.6],  # Moderate success
-                    [7, 4, 6, 3, 3, 0.8, 0.9],  # Very successful
-                    [2, 2, 3, 1, 1, 0.4, 0.5],  # Moderate success
-                ])
-                y = np.array([1, 0, 1, 1, 0])
-                
-                # Train the model with default data
-                predictor.model.fit(X, y)
-                predictor.scaler.fit(X)
-                predictor.is_trained = True
-
             success_probability = predictor.predict(survey_data)
             feature_importance = predictor.get_feature_importance()
             prediction_available = True
+            survey_data.success_probability = float(success_probability)
+            survey_data.model_version = predictor.version
 
             # Save the survey for future model training
             db.session.add(survey_data)
             db.session.commit()
+            notify_survey_changed(survey_data.id)
 
             # Format the probability as a percentage with color coding
             probability_percent = success_probability * 100
@@ -225,44 +287,13 @@ def quick_predict(job_id):
             self.certifications = 1  # Default to 1 certification
             self.language_proficiency = 0.6  # Default to intermediate
             self.interview_prep_score = 0.75  # Default to good preparation
+            self.job_offer = job  # Offer requirements feed the gap features
     
-    predictor = JobSuccessPredictor()
+    predictor = get_predictor()
     survey_data = SurveyData()
     
     try:
-        # Initialize model with default training data if not trained
-        if not predictor.is_trained:
-            # Create synthetic training data
-            X = np.array([
-                [5, 3, 5, 2, 2, 0.6, 0.8],  # Successful candidate
-                [1, 1, 2, 0, 0, 0.2, 0.3],  # Unsuccessful candidate
-                [3, 2, 4, 1, 1, 0.4, 0.6],  # Moderate success
-                [7, 4, 6, 3, 3, 0.8, 0.9],  # Very successful
-                [2, 2, 3, 1, 1, 0.4, 0.5],  # Moderate success
-            ])
-            y = np.array([1, 0, 1, 1, 0])
-            
-            # Train the model with default data
-            predictor.model.fit(X, y)
-            predictor.scaler.fit(X)
-            predictor.is_trained = True
-        
-        # Convert survey data to feature vector
-        features = np.array([[
-            survey_data.years_experience,
-            survey_data.education_level,
-            survey_data.num_skills,
-            survey_data.prev_job_changes,
-            survey_data.certifications,
-            survey_data.language_proficiency,
-            survey_data.interview_prep_score
-        ]])
-        
-        # Scale features if model is trained with a scaler
-        if predictor.scaler:
-            features = predictor.scaler.transform(features)
-        
-        success_probability = predictor.model.predict_proba(features)[0][1]
+        success_probability = prediction_cache.predict(predictor, survey_data)
         
         return jsonify({
             'success': True,
@@ -297,11 +328,11 @@ def predict_success():
             # Assuming more skills generally correlate with more experience
             self.years_experience = min(10, self.num_skills * 1.5)
     
-    predictor = JobSuccessPredictor()
+    predictor = get_predictor()
     survey_data = SurveyData(skills)
     
     try:
-        success_probability = predictor.predict(survey_data)
+        success_probability = prediction_cache.predict(predictor, survey_data)
         return jsonify({
             'success': True,
             'probability': round(success_probability * 100, 1),
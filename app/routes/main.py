@@ -1,11 +1,39 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import contains_eager, joinedload
 from app.models.survey import Survey
-from app.ml.model import JobSuccessPredictor
-import numpy as np
+from app.models.job_offer import JobOffer
+from app.ml.registry import get_predictor
+from app.ml.scoring import ensure_scores
+from app.ml.matching import matching_engine
 
 bp = Blueprint('main', __name__)
 
+# Minimum stored success probability for a candidate to be listed to employers
+TOP_CANDIDATE_THRESHOLD = 0.6
+
+def employer_candidates(employer_id):
+    """Surveys submitted to the employer's offers, joined to their offer"""
+    return Survey.query.join(Survey.job_offer).filter(JobOffer.employer_id == employer_id)
+
+def top_candidates_page(employer_id, page, per_page, limit):
+    """One page of the employer's best-scored candidates, capped at ``limit`` in total.
+
+    Threshold and ordering are applied in SQL on the stored scores, and one
+    extra row is fetched to tell whether another page exists.
+    """
+    offset = (page - 1) * per_page
+    size = min(per_page, limit - offset)
+    if size <= 0:
+        return [], False
+    rows = employer_candidates(employer_id) \
+        .filter(Survey.success_probability > TOP_CANDIDATE_THRESHOLD) \
+        .options(contains_eager(Survey.job_offer), joinedload(Survey.author)) \
+        .order_by(Survey.success_probability.desc(), Survey.id.desc()) \
+        .offset(offset).limit(size + 1).all()
+    has_next = len(rows) > size and offset + size < limit
+    return rows[:size], has_next
+
 @bp.route('/')
 @bp.route('/index')
 def index():
@@ -17,60 +45,40 @@ def dashboard():
     # Get user's surveys
     user_surveys = Survey.query.filter_by(user_id=current_user.id).all()
     
-    # Calculate probability for each survey
-    predictor = JobSuccessPredictor()
-    
-    # Ensure the model is trained before making predictions for the dashboard
-    try:
-        if not predictor.is_trained:
-            # Create synthetic training data if the model isn't trained yet
-            X_synthetic = np.array([
-                [5, 3, 5, 2, 2, 0.6, 0.8],  # Successful candidate
-                [1, 1, 2, 0, 0, 0.2, 0.3],  # Unsuccessful candidate
-                [3, 2, 4, 1, 1, 0.4, 0.6],  # Moderate success
-                [7, 4, 6, 3, 3, 0.8, 0.9],  # Very successful
-                [2, 2, 3, 1, 1, 0.4, 0.5],  # Moderate success
-            ])
-            y_synthetic = np.array([1, 0, 1, 1, 0])
-            
-            predictor.model.fit(X_synthetic, y_synthetic)
-            predictor.scaler.fit(X_synthetic)
-            predictor.is_trained = True
-    except Exception as e:
-        print(f"Dashboard model training error: {str(e)}")
-        # Optionally, you could flash a message to the user here about the model not being ready
-
-    for survey in user_surveys:
-        try:
-            probability = predictor.predict(survey)
-            survey.probability_percent = probability * 100
-        except Exception:
-            survey.probability_percent = None
+    # Scores are stored on the rows; only surveys without one are scored here
+    predictor = get_predictor()
+    ensure_scores(user_surveys, predictor)
 
     # Get public surveys from other users
     public_surveys = Survey.query.filter(
         Survey.user_id != current_user.id,
         Survey.is_public == True
     ).all()
+    ensure_scores(public_surveys, predictor)
     
     # For employers: show candidates with >60% probability for their job offers
     top_candidates = []
+    recommended_offers = []
+    candidates_page = max(request.args.get('candidates_page', 1, type=int), 1)
+    has_more_candidates = False
     if current_user.is_employer():
-        from app.models.job_offer import JobOffer
-        my_offers = JobOffer.query.filter_by(employer_id=current_user.id).all()
-        offer_ids = [offer.id for offer in my_offers]
-        candidate_surveys = Survey.query.filter(Survey.job_offer_id.in_(offer_ids)).all() if offer_ids else []
-        for survey in candidate_surveys:
-            try:
-                probability = predictor.predict(survey)
-                if probability * 100 > 60:
-                    survey.probability_percent = probability * 100
-                    top_candidates.append(survey)
-            except Exception:
-                continue
+        unscored = employer_candidates(current_user.id) \
+            .filter(Survey.success_probability.is_(None)).all()
+        ensure_scores(unscored, predictor)
+        top_candidates, has_more_candidates = top_candidates_page(
+            current_user.id,
+            candidates_page,
+            current_app.config.get('CANDIDATES_PER_PAGE', 20),
+            current_app.config.get('TOP_CANDIDATES_LIMIT', 200)
+        )
+    elif current_user.is_worker():
+        recommended_offers = matching_engine.offers_for_user(current_user.id)
 
     return render_template('main/dashboard.html',
                          title='Табло',
                          user_surveys=user_surveys,
                          public_surveys=public_surveys,
-                         top_candidates=top_candidates) 
\ No newline at end of file
+                         top_candidates=top_candidates,
+                         recommended_offers=recommended_offers,
+                         candidates_page=candidates_page,
+                         has_more_candidates=has_more_candidates) 
\ No newline at end of file
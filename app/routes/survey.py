@@ -3,6 +3,9 @@ from flask_login import login_required, current_user
 from app import db
 from app.models.survey import Survey
 from app.forms.survey import SurveyForm
+from app.ml.scoring import score_surveys
+from app.ml.online import notify_new_survey
+from app.ml.matching import notify_survey_changed
 
 bp = Blueprint('survey', __name__)
 
@@ -29,8 +32,15 @@ def new_survey():
                 success=form.success.data,
                 is_public=form.is_public.data
             )
+            try:
+                score_surveys([survey])
+            except Exception as e:
+                # The survey is still worth saving; it gets scored on the next rescore
+                print(f"Prediction error: {str(e)}")
             db.session.add(survey)
             db.session.commit()
+            notify_new_survey(survey)
+            notify_survey_changed(survey.id)
             flash('Анкетата е изпратена успешно!', 'success')
             return redirect(url_for('main.dashboard'))
         except Exception as e:
@@ -0,0 +1,83 @@
+import re
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+IMPORT_TIME_LINE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| \s*(\S+)$')
+
+COLD_START_SCRIPT = (
+    'import time; started = time.perf_counter(); '
+    'from app import create_app; create_app(); '
+    'print((time.perf_counter() - started) * 1000)'
+)
+
+
+class StartupTimer:
+    """Records how long each step of create_app takes.
+
+    The timings are kept on ``app.extensions['startup_timer']``, logged when
+    STARTUP_TIMING is on, and a warning is logged when the total exceeds
+    STARTUP_BUDGET_MS.
+    """
+
+    def __init__(self):
+        self.steps = []
+        self.total = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - started))
+
+    def finish(self, app):
+        self.total = time.perf_counter() - self._started
+        app.extensions['startup_timer'] = self
+
+        if app.config.get('STARTUP_TIMING'):
+            app.logger.info('Startup timings:\n%s', self.report())
+        budget = app.config.get('STARTUP_BUDGET_MS')
+        if budget and self.total * 1000 > budget:
+            app.logger.warning('App startup took %.0f ms, over the %d ms budget; slowest step: %s',
+                               self.total * 1000, budget, self.slowest()[0])
+
+    def slowest(self):
+        return max(self.steps, key=lambda step: step[1])
+
+    def report(self):
+        """One line per step, slowest first, with the total at the end"""
+        lines = [f'  {name:<28} {seconds * 1000:8.1f} ms'
+                 for name, seconds in sorted(self.steps, key=lambda step: -step[1])]
+        lines.append(f"  {'total':<28} {self.total * 1000:8.1f} ms")
+        return '\n'.join(lines)
+
+
+def cold_start(root):
+    """Create the app in a fresh interpreter; return its boot time and per-package import times (ms)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', COLD_START_SCRIPT],
+        cwd=root, capture_output=True, text=True, check=True
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        # Root packages at any depth; their cumulative time includes their submodules
+        # and whatever they import first, so the figures overlap
+        if match and '.' not in match.group(2):
+            packages[match.group(2)] = int(match.group(1)) / 1000
+    return float(result.stdout.strip().splitlines()[-1]), packages
+
+
+def measure_cold_start(root, runs=5):
+    """Median boot time and median per-package import time over several cold starts"""
+    samples = [cold_start(root) for _ in range(runs)]
+    packages = {name for _, imported in samples for name in imported}
+    return (
+        statistics.median(boot for boot, _ in samples),
+        {name: statistics.median(imported.get(name, 0) for _, imported in samples) for name in packages},
+    )
@@ -10,6 +10,70 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'instance', 'job_success.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool for server databases (PostgreSQL, MySQL) and SQLite files
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', '10')),
+        'pool_recycle': int(os.environ.get('DATABASE_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': os.environ.get('DATABASE_POOL_PRE_PING', 'true').lower() in ['true', 'on', '1'],
+    }
+
+    # SQLite tuning, applied on every new connection
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'true').lower() in ['true', 'on', '1']
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'))  # milliseconds
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))  # bytes
+
+    # Log how long each step of create_app takes, and warn above the budget (0 disables)
+    STARTUP_TIMING = os.environ.get('STARTUP_TIMING', 'false').lower() in ['true', 'on', '1']
+    STARTUP_BUDGET_MS = int(os.environ.get('STARTUP_BUDGET_MS', '2000'))
+
+    # Published model versions (default: <instance>/models); older ones beyond KEEP are pruned
+    MODEL_STORE_DIR = os.environ.get('MODEL_STORE_DIR')
+    MODEL_STORE_KEEP = int(os.environ.get('MODEL_STORE_KEEP', '5'))
+    # Seconds between checks for a newly activated version in each worker
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', '2'))
+
+    # Start `flask ml rescore` in the background when the model is deleted from the admin page
+    RESCORE_ON_MODEL_CHANGE = os.environ.get('RESCORE_ON_MODEL_CHANGE', 'true').lower() in ['true', 'on', '1']
+
+    # Online learning: fold newly labelled surveys into the model every N submissions
+    ONLINE_LEARNING = os.environ.get('ONLINE_LEARNING', 'false').lower() in ['true', 'on', '1']
+    ONLINE_UPDATE_BATCH_SIZE = int(os.environ.get('ONLINE_UPDATE_BATCH_SIZE', '50'))
+    
+    # Job offers shown per page of the listing
+    JOB_OFFERS_PER_PAGE = int(os.environ.get('JOB_OFFERS_PER_PAGE', '20'))
+
+    # Employer dashboard: candidates per page and the most candidates listed in total
+    CANDIDATES_PER_PAGE = int(os.environ.get('CANDIDATES_PER_PAGE', '20'))
+    TOP_CANDIDATES_LIMIT = int(os.environ.get('TOP_CANDIDATES_LIMIT', '200'))
+
+    # Matching engine: recommendations kept per survey and per offer, how many
+    # education levels below an offer's requirement still match, and whether
+    # the lists are refreshed when a survey or offer changes. Changes are queued
+    # in match_change and applied by a background thread when MATCH_WORKER is
+    # on, otherwise by `flask match refresh` (e.g. from cron)
+    MATCH_TOP_K = int(os.environ.get('MATCH_TOP_K', '20'))
+    MATCH_EDUCATION_SLACK = int(os.environ.get('MATCH_EDUCATION_SLACK', '0'))
+    MATCH_ON_CHANGE = os.environ.get('MATCH_ON_CHANGE', 'true').lower() in ['true', 'on', '1']
+    MATCH_WORKER = os.environ.get('MATCH_WORKER', 'true').lower() in ['true', 'on', '1']
+    # Most (survey, offer) rows scored in one call, and most lists ranked again
+    # with a change; the rest are queued
+    MATCH_PAIR_BLOCK = int(os.environ.get('MATCH_PAIR_BLOCK', str(2 ** 18)))
+    MATCH_BACKFILL_LIMIT = int(os.environ.get('MATCH_BACKFILL_LIMIT', '50'))
+
+    # Rows per page in the admin dashboard tables
+    ADMIN_PER_PAGE = int(os.environ.get('ADMIN_PER_PAGE', '25'))
+
+    # Batch prediction API limits
+    PREDICT_BATCH_MAX_ROWS = int(os.environ.get('PREDICT_BATCH_MAX_ROWS', '1000'))
+    PREDICT_BATCH_MAX_BYTES = int(os.environ.get('PREDICT_BATCH_MAX_BYTES', str(1024 * 1024)))
+    
+    # Prediction cache: 'memory' (per process), 'sqlite' (shared by workers on one host) or 'none'
+    PREDICTION_CACHE_BACKEND = os.environ.get('PREDICTION_CACHE_BACKEND', 'memory')
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+    PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', '3600'))
     
     # Mail settings
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -0,0 +1,24 @@
+import gc
+import multiprocessing
+import os
+
+# Run with: gunicorn -c gunicorn.conf.py run:app
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+
+# Create the app once in the master and fork the workers from it
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ['true', 'on', '1']
+
+
+def on_starting(server):
+    """Load the ML stack in the master so forked workers share it copy-on-write"""
+    if not preload_app:
+        return
+    from app.ml.registry import warm_up
+
+    predictor = warm_up()
+    server.log.info('Prediction model %s loaded before forking workers', predictor.version)
+    # Keep the garbage collector from touching (and so copying) the shared objects
+    gc.freeze()
@@ -0,0 +1,48 @@
+"""Add full-text search index over job offers
+
+Revision ID: e4b7c2a9f513
+Revises: c83e4a6f1d27
+Create Date: 2026-10-18 16:22:09.481532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7c2a9f513'
+down_revision = 'c83e4a6f1d27'
+branch_labels = None
+depends_on = None
+
+# Copies of app.job_search.FTS_SCHEMA and POSTGRES_DOCUMENT as of this revision
+FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS job_offer_fts USING fts5("
+    "title, description, requirements, location, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', location), 'B') || "
+    "setweight(to_tsvector('simple', requirements), 'C') || "
+    "setweight(to_tsvector('simple', description), 'D')"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(FTS_SCHEMA)
+        op.execute(
+            "INSERT INTO job_offer_fts(rowid, title, description, requirements, location) "
+            "SELECT id, title, description, requirements, location FROM job_offer"
+        )
+    elif dialect == 'postgresql':
+        op.execute(f'CREATE INDEX IF NOT EXISTS ix_job_offer_search ON job_offer USING GIN (({POSTGRES_DOCUMENT}))')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS job_offer_fts')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_job_offer_search')